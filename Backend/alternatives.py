@@ -0,0 +1,146 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from graph_loader import haversine_distance
+
+# ---------------------- Multi-objective Route Search ----------------------
+
+class EdgeArrays:
+    """Directed subgraph flattened once into a CSR matrix whose data array is swapped per query"""
+
+    def __init__(self, subgraph):
+        self.nodes = list(subgraph.nodes())
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        self.edges = list(subgraph.edges(data=True))
+        self.rows = np.array([self.index[u] for u, _, _ in self.edges], dtype=np.int32)
+        self.cols = np.array([self.index[v] for _, v, _ in self.edges], dtype=np.int32)
+        self.edge_of = {(r, c): i for i, (r, c) in enumerate(zip(self.rows, self.cols))}
+
+        coords = np.array(self.nodes)
+        r, c = self.rows, self.cols
+        self.distance = haversine_distance(coords[r, 1], coords[r, 0], coords[c, 1], coords[c, 0])
+        self.weather = self.attribute('weather_penalty')
+
+        n = len(self.nodes)
+        self.graph = csr_matrix((np.arange(1, len(self.edges) + 1, dtype=float), (r, c)), shape=(n, n))
+        self.order = self.graph.data.astype(int) - 1  # Edge index stored in each CSR slot
+
+    def attribute(self, key):
+        return np.nan_to_num(np.array([d.get(key, 0.0) for _, _, d in self.edges], dtype=float))
+
+    def _set_cost(self, cost):
+        self.graph.data = cost[self.order] + 1e-9  # Keep zero-cost edges explicit
+
+    def cost_to_target(self, cost, target):
+        """Reverse Dijkstra: cost from every node to target and the edge indices from source to it"""
+        self._set_cost(cost)
+        dist, next_hop = dijkstra(self.graph.T, indices=target, return_predecessors=True)
+
+        def used_from(source):
+            if next_hop[source] < 0:
+                return None
+            used, u = [], source
+            while u != target:
+                used.append(self.edge_of[(u, next_hop[u])])
+                u = next_hop[u]
+            return np.array(used)
+        return dist, used_from
+
+    def shortest(self, cost, source, target, bound=np.inf, potential=None):
+        """Single-source Dijkstra on the shared matrix; returns the edge indices used.
+
+        potential is a lower bound on each node's cost to target that never
+        drops by more than an edge's cost along it (e.g. from cost_to_target).
+        Searching on the reduced costs is then A*, and bound, the cost of any
+        known route, stops it from settling nodes that cannot improve on it.
+        """
+        limit = bound * (1 + 1e-6) + 1e-6
+        if potential is not None:
+            pot = np.where(np.isfinite(potential), potential, 0.0)
+            cost = np.maximum(cost + pot[self.cols] - pot[self.rows], 0)
+            limit -= pot[source]
+        self._set_cost(cost)
+        dist, predecessors = dijkstra(self.graph, indices=source, return_predecessors=True,
+                                      limit=limit if np.isfinite(limit) else np.inf)
+        self.settled = int(np.isfinite(dist).sum())
+        if predecessors[target] < 0:
+            return None
+
+        used, v = [], target
+        while v != source:
+            u = predecessors[v]
+            used.append(self.edge_of[(u, v)])
+            v = u
+        return np.array(used[::-1])
+
+    def route(self, used):
+        path = [self.nodes[self.rows[used[0]]]] + [self.nodes[c] for c in self.cols[used]]
+        return {
+            'path': path,
+            'distance': float(self.distance[used].sum()),
+            'weather': float(self.weather[used].sum())
+        }
+
+def pareto_routes(subgraph, start_node, end_node, k=5):
+    """Pareto frontier of distance vs. weather penalty.
+
+    One reverse Dijkstra per objective gives the exact cost to the target
+    under distance alone and weather alone, and with them the two extreme
+    routes. Their weighted sum is an A* lower bound for every weighted-sum
+    query in between, and the cheapest known route bounds each search, so the
+    k - 2 intermediate queries only settle nodes near the frontier. Duplicate
+    and dominated routes are dropped. Sorted by distance.
+    """
+    arrays = EdgeArrays(subgraph)
+    d_norm = arrays.distance / max(arrays.distance.mean(), 1e-9)
+    w_norm = arrays.weather / max(arrays.weather.mean(), 1e-9)
+    source, target = arrays.index[start_node], arrays.index[end_node]
+
+    to_target_d, used_from_d = arrays.cost_to_target(d_norm, target)
+    to_target_w, used_from_w = arrays.cost_to_target(w_norm, target)
+    found = [used for used in (used_from_w(source), used_from_d(source)) if used is not None]
+    if not found:
+        return []
+
+    for lam in np.linspace(0, 1, k)[1:-1]:
+        cost = lam * d_norm + (1 - lam) * w_norm
+        bound = min(cost[used].sum() for used in found)
+        used = arrays.shortest(cost, source, target, bound, lam * to_target_d + (1 - lam) * to_target_w)
+        if used is not None:
+            found.append(used)
+
+    seen, routes = set(), []
+    for used in found:
+        if tuple(used) not in seen:
+            seen.add(tuple(used))
+            routes.append(arrays.route(used))
+
+    routes.sort(key=lambda r: (r['distance'], r['weather']))
+    frontier, best_weather = [], float('inf')
+    for route in routes:
+        if route['weather'] < best_weather:
+            frontier.append(route)
+            best_weather = route['weather']
+    return frontier
+
+def alternative_routes(subgraph, start_node, end_node, k=3, weight='weight', penalty=0.5):
+    """k diverse routes by edge penalization.
+
+    After each route, the cost of the edges it used is raised by penalty so the
+    next query prefers a different corridor. Costs are always reported with
+    the original distance and weather values.
+    """
+    arrays = EdgeArrays(subgraph)
+    cost = arrays.attribute(weight)
+    source, target = arrays.index[start_node], arrays.index[end_node]
+
+    seen, routes = set(), []
+    for _ in range(k):
+        used = arrays.shortest(cost, source, target)
+        if used is None:
+            break
+        if tuple(used) not in seen:
+            seen.add(tuple(used))
+            routes.append(arrays.route(used))
+        cost[used] *= 1 + penalty
+    return routes
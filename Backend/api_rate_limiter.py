@@ -1,29 +1,148 @@
+import asyncio
+import json
+import os
+import threading
 import time
-from collections import deque
 from functools import wraps
 
-class RateLimiter:
-    def __init__(self, max_calls: int, period: int):
-        self.max_calls = max_calls
-        self.period = period
-        self.calls = deque()
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class FileLockBackend:
+    """Bucket state shared by every process on the host through a locked JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def update(self, name, fn):
+        """Apply fn(state) -> (state, result) to one bucket's state under an exclusive file lock"""
+        with open(self.path, "a+") as f:
+            self._lock(f)
+            try:
+                f.seek(0)
+                raw = f.read()
+                states = json.loads(raw) if raw else {}
+                states[name], result = fn(states.get(name))
+                f.seek(0)
+                f.truncate()
+                json.dump(states, f)
+                f.flush()
+            finally:
+                self._unlock(f)
+        return result
+
+    @staticmethod
+    def _lock(f):
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    @staticmethod
+    def _unlock(f):
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class TokenBucket:
+    """Token bucket refilled at max_calls per period, holding at most burst tokens.
+
+    Callers reserve tokens up front and are told exactly how long to wait, so
+    concurrent callers queue behind each other instead of all sleeping for a
+    whole window. Thread-safe; pass a FileLockBackend to share across processes.
+    """
+
+    def __init__(self, name, max_calls, period, burst=None, backend=None):
+        self.name = name
+        self.rate = max_calls / period
+        self.burst = burst or max_calls
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._state = None
+        self.total_wait = 0.0
+        self.calls = 0
+
+    def _reserve(self, state, tokens):
+        now = time.time()
+        available, updated = state if state else (self.burst, now)
+        available = min(self.burst, available + (now - updated) * self.rate) - tokens
+        wait = max(0.0, -available / self.rate)
+        return [available, now], wait
+
+    def reserve(self, tokens=1):
+        """Take tokens and return the seconds the caller must wait before using them"""
+        with self._lock:
+            if self.backend:
+                wait = self.backend.update(self.name, lambda state: self._reserve(state, tokens))
+            else:
+                self._state, wait = self._reserve(self._state, tokens)
+            self.calls += 1
+            self.total_wait += wait
+        if wait > 0:
+            print(f"Rate limit reached for {self.name}. Waiting {wait:.1f} seconds")
+        return wait
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available; returns the time waited"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """Await until tokens are available without blocking the event loop"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
 
     def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                await self.acquire_async()
+                return await func(*args, **kwargs)
+            return async_wrapper
+
         @wraps(func)
-        async def wrapper(*args, **kwargs):
-            now = time.time()
-            while self.calls and now - self.calls[0] >= self.period:
-                self.calls.popleft()
-
-            if len(self.calls) >= self.max_calls:
-                sleep_time = self.period - (now - self.calls[0])
-                print(f"Rate limit reached. Sleeping for {sleep_time:.1f} seconds")
-                await asyncio.sleep(sleep_time)
-
-            result = await func(*args, **kwargs)
-            self.calls.append(time.time())
-            return result
+        def wrapper(*args, **kwargs):
+            self.acquire()
+            return func(*args, **kwargs)
         return wrapper
 
-# Initialize rate limiter for weather API (500 calls/minute)
-weather_rate_limiter = RateLimiter(500, 60)
\ No newline at end of file
+class RateLimiter:
+    """Named token buckets with separate quotas per API endpoint"""
+
+    def __init__(self, quotas, state_path=None):
+        backend = FileLockBackend(state_path) if state_path else None
+        self.buckets = {
+            name: TokenBucket(name, backend=backend, **quota) for name, quota in quotas.items()
+        }
+
+    def acquire(self, endpoint, tokens=1):
+        return self.buckets[endpoint].acquire(tokens)
+
+    async def acquire_async(self, endpoint, tokens=1):
+        return await self.buckets[endpoint].acquire_async(tokens)
+
+    def stats(self):
+        return {
+            name: {'calls': b.calls, 'total_wait': round(b.total_wait, 3)}
+            for name, b in self.buckets.items()
+        }
+
+# Open-Meteo counts each location in a multi-location request as one call.
+# Set RATE_LIMIT_STATE to a file path to share the quota across worker processes.
+weather_rate_limiter = RateLimiter(
+    {
+        'forecast': {'max_calls': 500, 'period': 60, 'burst': 100},
+        'marine': {'max_calls': 500, 'period': 60, 'burst': 100},
+    },
+    state_path=os.environ.get("RATE_LIMIT_STATE")
+)
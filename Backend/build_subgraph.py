@@ -1,32 +1,57 @@
-import networkx as nx
-from sklearn.neighbors import BallTree
 import numpy as np
-import re
-import plotly.graph_objects as go
-from graph_loader import haversine_distance
 
 # ---------------------- Optimized Subgraph Builder ----------------------
 
-def build_subgraph(G, tree, node_array, a_star_path, radius_km=700):
-    """Efficient subgraph construction around A* path"""
-    earth_radius_km = 6371
-    radius_rad = radius_km / earth_radius_km
-    subgraph_nodes = set()
-    node_list = list(G.nodes())
+def polar_scale(lats):
+    """Radius factor that keeps node counts per corridor point steady on a lon/lat grid.
 
-    for lon, lat in a_star_path:
-        query_rad = np.radians([[lat, lon]])  # BallTree expects (lat, lon)
-        indices = tree.query_radius(query_rad, r=radius_rad)[0]
+    Grid nodes crowd together by 1/cos(lat) towards the poles, so shrinking the
+    radius by sqrt(cos(lat)) keeps the covered node count roughly constant.
+    """
+    return np.sqrt(np.clip(np.cos(np.radians(lats)), 0.1, 1))
 
-        # Vectorized distance calculation
-        candidates = node_array[indices]
-        distances = haversine_distance(lat, lon, candidates[:, 0], candidates[:, 1])
-        close_indices = indices[distances <= radius_km]
+def build_subgraph(G, tree, node_array, a_star_path, radius_km=700):
+    """Efficient subgraph construction around A* path"""
+    node_list = tree.nodes
+    path = np.array(a_star_path, dtype=float)
+    radii = radius_km * polar_scale(path[:, 1])
 
-        for idx in close_indices:
-            subgraph_nodes.add(node_list[idx])
+    # One batched great-circle radius query for the whole path
+    indices = tree.query_radius(path, radii)
+    subgraph_nodes = {node_list[idx] for close_indices in indices for idx in close_indices}
 
     print(len(subgraph_nodes))
     subgraph_nodes.update(a_star_path)
     
     return G.subgraph(subgraph_nodes)
+
+
+def build_adaptive_subgraph(G, tree, node_array, centerline, spacing_km, variability=None,
+                            radius_factor=1.5, min_radius_km=150, max_radius_km=700,
+                            max_nodes=60000):
+    """Corridor around a (possibly coarse) centerline with a per-point radius.
+
+    Each radius scales with the local grid spacing and is widened by the weather
+    variability (0-1) at that point. Radii shrink uniformly until the corridor
+    fits within max_nodes, so long voyages stay bounded.
+    """
+    node_list = tree.nodes
+    points = np.array(centerline, dtype=float)
+
+    radii = radius_factor * np.asarray(spacing_km, dtype=float) * polar_scale(points[:, 1])
+    if variability is not None:
+        radii *= 1 + np.clip(np.asarray(variability, dtype=float), 0, 1)
+    radii = np.clip(radii, min_radius_km, max_radius_km)
+
+    while True:
+        indices = tree.query_radius(points, radii)
+        close_indices = np.unique(np.concatenate([np.asarray(i, dtype=int) for i in indices]))
+        if len(close_indices) <= max_nodes or np.all(radii <= min_radius_km):
+            break
+        radii = np.maximum(radii * np.sqrt(max_nodes / len(close_indices)), min_radius_km)
+
+    print(len(close_indices))
+    subgraph_nodes = {node_list[idx] for idx in close_indices}
+    subgraph_nodes.update(n for n in centerline if n in G)
+
+    return G.subgraph(subgraph_nodes)
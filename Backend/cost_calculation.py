@@ -90,3 +90,30 @@ def combined_cost(edge_distance, remaining_distance, weather_penalty, direction_
         0.5* (log_remaining / log_total) +  # Maintains impact when small
         0.5 * weather_penalty 
     )
+
+
+# Array field -> (source, API variable) for the vectorized cost kernels
+WEATHER_FIELDS = {
+    'wind_speed': ('weather', 'wind_speed_10m'),
+    'wind_direction': ('weather', 'wind_direction_10m'),
+    'wave_height': ('marine', 'wave_height'),
+    'wave_direction': ('marine', 'wave_direction'),
+    'current_velocity': ('marine', 'ocean_current_velocity'),
+    'current_direction': ('marine', 'ocean_current_direction'),
+}
+
+def build_weather_arrays(locations, weather_results, marine_results):
+    """Columnar float arrays (NaN where missing) of current conditions, one row per location"""
+    sources = {'weather': weather_results, 'marine': marine_results}
+    arrays = {}
+    for field, (source, key) in WEATHER_FIELDS.items():
+        results = sources[source]
+        arrays[field] = np.array([
+            safe_get(results.get(loc, {}).get('current', {}), key, np.nan) for loc in locations
+        ], dtype=float)
+    return arrays
+
+def alignment_penalty_array(actual_dir, desired_bearing):
+    """Vectorized alignment penalty: 0=aligned, 1=opposed, 0 where direction is missing"""
+    penalty = (1 - np.cos(np.radians(actual_dir - desired_bearing))) / 2
+    return np.nan_to_num(penalty)
@@ -1,8 +1,12 @@
 import networkx as nx
 import re
-from sklearn.neighbors import BallTree
+import weakref
+from scipy.spatial import cKDTree
 import numpy as np
 
+EARTH_RADIUS_KM = 6371
+_spatial_indexes = weakref.WeakKeyDictionary()
+
 def parse_node_id(node_id):
     """Convert node ID string to (lon, lat) tuple"""
     try:
@@ -22,16 +26,49 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     a = np.sin(dlat / 2)**2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2)**2
     return 2 * R * np.arcsin(np.sqrt(a))
 
+def to_unit_vectors(lon, lat):
+    """Earth-centred 3D unit vectors for (lon, lat) degrees"""
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+class SpatialIndex:
+    """cKDTree over 3D unit vectors of (lon, lat) nodes.
+
+    Straight-line (chord) distance between unit vectors is monotonic in
+    great-circle distance, so radius and nearest-neighbour queries are exact
+    everywhere, including across the antimeridian and near the poles.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        coords = np.array(self.nodes, dtype=float)
+        self.tree = cKDTree(to_unit_vectors(coords[:, 0], coords[:, 1]))
+
+    def query(self, coords, k=1):
+        """Nearest k nodes to (lon, lat) coords; returns (distance_km, index) arrays"""
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        chord, idx = self.tree.query(to_unit_vectors(coords[:, 0], coords[:, 1]), k=k)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1)), idx
+
+    def query_radius(self, coords, radius_km):
+        """Indices of nodes within radius_km (scalar or one per point) of each (lon, lat) coord"""
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        angle = np.minimum(np.asarray(radius_km, dtype=float) / EARTH_RADIUS_KM, np.pi)
+        chord = 2 * np.sin(angle / 2)
+        return self.tree.query_ball_point(to_unit_vectors(coords[:, 0], coords[:, 1]), r=chord)
+
 def build_spatial_index(G):
-    """Create BallTree index for spatial queries using (lat, lon) format"""
-    nodes = np.array([(lat, lon) for (lon, lat) in G.nodes()])
-    return BallTree(np.radians(nodes), metric='haversine'), nodes
+    """Spatial index over the graph nodes (cached per graph) and the (lat, lon) node array"""
+    if G not in _spatial_indexes:
+        _spatial_indexes[G] = SpatialIndex(G.nodes())
+    index = _spatial_indexes[G]
+    nodes = np.array([(lat, lon) for (lon, lat) in index.nodes])
+    return index, nodes
 
 def find_nearest_water_node(G, query_coord, tree):
     """Find nearest graph node to given (lon, lat) coordinate"""
-    query = np.radians([[query_coord[1], query_coord[0]]])  # Convert to (lat, lon)
-    _, idx = tree.query(query, k=1)
-    return list(G.nodes())[idx[0][0]]
+    _, idx = tree.query([query_coord], k=1)
+    return tree.nodes[idx[0]]
 
 def load_navigation_graph(file_path):
     """Load and validate the ship routing graph"""
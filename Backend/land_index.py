@@ -0,0 +1,88 @@
+import json
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import shape
+from multires_graph import estimate_grid_step
+
+def build_land_index(G, shrink=0.4, tile_cells=32):
+    """STRtree of land polygons, i.e. blocked grid positions inside the graph extent with no node.
+
+    Runs of blocked cells are merged into solid polygons, then shrunk to
+    shrink * grid step around the blocked centres so no edge between
+    neighbouring water nodes touches them. The result is clipped into tiles of
+    tile_cells cells to keep each indexed polygon small.
+    """
+    step = estimate_grid_step(G)
+    coords = np.array(G.nodes())
+    origin = coords.min(axis=0)
+    idx = np.rint((coords - origin) / step).astype(int)
+    shape_ij = idx.max(axis=0) + 1
+
+    blocked = np.ones(shape_ij, dtype=bool)
+    blocked[idx[:, 0], idx[:, 1]] = False
+    if not blocked.any():
+        return STRtree([])
+
+    # Runs of consecutive blocked cells along each grid column become one full-width box
+    padded = np.zeros((shape_ij[0], shape_ij[1] + 2), dtype=bool)
+    padded[:, 1:-1] = blocked
+    edges = np.diff(padded.astype(np.int8), axis=1)
+    col, first = np.nonzero(edges == 1)
+    _, end = np.nonzero(edges == -1)
+    x = origin[0] + col * step
+    runs = shapely.box(x - step / 2, origin[1] + (first - 0.5) * step,
+                       x + step / 2, origin[1] + (end - 0.5) * step)
+
+    land = shapely.union_all(runs).buffer(-(0.5 - shrink) * step, join_style="mitre")
+
+    # Clip into tiles so queries test small polygons rather than whole continents
+    tile = tile_cells * step
+    tx, ty = np.meshgrid(np.arange(np.ceil(shape_ij[0] / tile_cells)), np.arange(np.ceil(shape_ij[1] / tile_cells)))
+    x0 = origin[0] - step / 2 + tx.ravel() * tile
+    y0 = origin[1] - step / 2 + ty.ravel() * tile
+    pieces = shapely.intersection(land, shapely.box(x0, y0, x0 + tile, y0 + tile))
+    pieces = shapely.get_parts(pieces[~shapely.is_empty(pieces)])
+    pieces = pieces[shapely.area(pieces) > 0]
+    print(f"Land index: {blocked.sum()} blocked cells in {len(pieces)} polygons")
+    return STRtree(pieces)
+
+def load_land_index(file_path):
+    """STRtree of land polygons from a GeoJSON FeatureCollection"""
+    with open(file_path) as f:
+        features = json.load(f)["features"]
+    return STRtree([shape(feature["geometry"]) for feature in features])
+
+def split_antimeridian(segments):
+    """Split (n, 2, 2) (lon, lat) segments that cross 180 degrees.
+
+    Each segment takes the shorter way round, whether its longitudes are
+    wrapped or unwrapped. Returns the pieces with longitudes in [-180, 180]
+    and the index of the segment each piece came from.
+    """
+    segments = np.array(segments, dtype=float).reshape(-1, 2, 2)
+    a, b = segments[:, 0].copy(), segments[:, 1].copy()
+    a[:, 0] = (a[:, 0] + 180) % 360 - 180
+    b[:, 0] = a[:, 0] + (b[:, 0] - a[:, 0] + 180) % 360 - 180
+    owners = np.arange(len(segments))
+
+    crossing = np.abs(b[:, 0]) > 180
+    side = np.sign(b[crossing, 0]) * 180
+    t = (side - a[crossing, 0]) / (b[crossing, 0] - a[crossing, 0])
+    mid_lat = a[crossing, 1] + t * (b[crossing, 1] - a[crossing, 1])
+
+    first = np.stack((a[crossing], np.column_stack((side, mid_lat))), axis=1)
+    second = np.stack((np.column_stack((-side, mid_lat)), b[crossing] - np.column_stack((2 * side, np.zeros_like(side)))), axis=1)
+    pieces = np.concatenate((np.stack((a[~crossing], b[~crossing]), axis=1), first, second))
+    return pieces, np.concatenate((owners[~crossing], owners[crossing], owners[crossing]))
+
+def segments_crossing_land(land_tree, segments):
+    """Boolean mask of which (n, 2, 2) (lon, lat) segments intersect land"""
+    segments = np.asarray(segments, dtype=float)
+    hits = np.zeros(len(segments), dtype=bool)
+    if len(segments) == 0:
+        return hits
+    pieces, owners = split_antimeridian(segments)
+    hit_idx, _ = land_tree.query(shapely.linestrings(pieces), predicate="intersects")
+    hits[owners[hit_idx]] = True
+    return hits
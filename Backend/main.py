@@ -1,35 +1,12 @@
-import time
 import numpy as np
 import networkx as nx
 from geopy.distance import geodesic
 from cost_calculation import combined_cost, calculate_weather_cost
-from weather_api import fetch_weather_data, fetch_weather_marine_data
+from weather_api import batch_fetch_weather_data
 from graph_loader import load_navigation_graph, build_spatial_index, find_nearest_water_node
 from build_subgraph import build_subgraph
 from plot import plot_subgraph
 from collections import defaultdict
-from datetime import datetime
-
-class RateLimiter:
-    def __init__(self, max_calls, period):
-        self.max_calls = max_calls
-        self.period = period
-        self.calls = []
-
-    def wait(self):
-        """Block until we can make another API call"""
-        now = time.time()
-        # Remove expired calls
-        self.calls = [t for t in self.calls if now - t < self.period]
-        
-        if len(self.calls) >= self.max_calls:
-            oldest = self.calls[0]
-            sleep_time = self.period - (now - oldest)
-            if sleep_time > 0:
-                print(f"Rate limit reached. Sleeping {sleep_time:.1f} seconds")
-                time.sleep(sleep_time)
-            self.calls = []
-        self.calls.append(time.time())
 
 def _calculate_geographic_bearing(pointA, pointB):
     lat1, lon1 = np.radians(pointA[1]), np.radians(pointA[0])
@@ -41,48 +18,6 @@ def _calculate_geographic_bearing(pointA, pointB):
     initial_bearing = np.arctan2(x, y)
     return (np.degrees(initial_bearing) + 360) % 360
 
-def batch_fetch_weather_data(locations, batch_size=100):
-    """Fetch weather and marine data in batches with rate limiting"""
-    weather_results = {}
-    marine_results = {}
-
-    batch_count = 0
-    minute_start_time = None
-
-    # Process in batches
-    for i in range(0, len(locations), batch_size):
-        if batch_count % 5 == 0:
-            minute_start_time = time.time()
-
-        batch = locations[i:i+batch_size]
-        lats = [loc[0] for loc in batch]
-        lons = [loc[1] for loc in batch]
-
-        # Fetch weather data
-        weather_data = fetch_weather_data(lats, lons)
-
-        # Fetch marine data
-        marine_data = fetch_weather_marine_data(lats, lons)
-
-        # Store results with location as key
-        for j, loc in enumerate(batch):
-            weather_results[loc] = weather_data[j] if j < len(weather_data) else {}
-            marine_results[loc] = marine_data[j] if j < len(marine_data) else {}
-
-        batch_count += 1
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Processed batch {batch_count}/{(len(locations) + batch_size - 1) // batch_size}")
-
-        # if batch_count % 5 == 0:
-        #     elapsed = time.time() - minute_start_time
-        #     if elapsed < 60:
-        #         time_to_sleep = 60 - elapsed
-        #         print(f"Sleeping for {round(time_to_sleep, 2)} seconds to respect rate limits...")
-        #         time.sleep(time_to_sleep)
-        # else:
-        time.sleep(11)
-
-    return weather_results, marine_results
-
 def update_subgraph_weights(subgraph, start_node, end_node):
     """Update edge weights with weather-aware costs using target node's weather data"""
     # Calculate total distance for normalization
@@ -0,0 +1,130 @@
+import sys
+import networkx as nx
+import numpy as np
+from collections import defaultdict
+from graph_loader import haversine_distance, load_navigation_graph
+from build_subgraph import build_adaptive_subgraph
+
+KM_PER_DEGREE = 111.32
+
+# ---------------------- Offline Hierarchy Builder ----------------------
+
+def estimate_grid_step(G):
+    """Median spacing in degrees between neighbouring grid nodes"""
+    edges = np.array(G.edges(), dtype=float).reshape(-1, 2, 2)
+    if len(edges) == 0:
+        return 0.0
+    return float(np.median(np.abs(edges[:, 0] - edges[:, 1]).max(axis=1)))
+
+def cell_index(node, cell_deg):
+    """Coarse cell (column, row) containing a (lon, lat) node"""
+    return (int(np.floor((node[0] + 180) / cell_deg)), int(np.floor((node[1] + 90) / cell_deg)))
+
+def _coastal_nodes(G, coast_buffer):
+    """Nodes missing grid neighbours (land or graph edge), grown by coast_buffer rings"""
+    full_degree = max(d for _, d in G.degree())
+    coastal = {n for n, d in G.degree() if d < full_degree}
+    frontier = set(coastal)
+    for _ in range(coast_buffer):
+        frontier = {m for n in frontier for m in G.neighbors(n)} - coastal
+        coastal |= frontier
+    return coastal
+
+def build_hierarchical_graph(G, coarse_factor=8, coast_buffer=2):
+    """Collapse open-ocean grid cells into coarse nodes, keep full resolution near land.
+
+    Coarse nodes are keyed by the (lon, lat) centroid of their members and carry
+    level=1 plus their cell index; full-resolution nodes keep their id and level=0.
+    """
+    step = estimate_grid_step(G)
+    cell_deg = step * coarse_factor
+    coastal = _coastal_nodes(G, coast_buffer)
+
+    members = defaultdict(list)
+    for n in G.nodes():
+        members[cell_index(n, cell_deg)].append(n)
+    fine_cells = {cell_index(n, cell_deg) for n in coastal}
+
+    H = nx.Graph(cell_deg=cell_deg, grid_step=step)
+    lift = {}
+    for idx, nodes in members.items():
+        if idx in fine_cells:
+            for n in nodes:
+                H.add_node(n, level=0)
+                lift[n] = n
+            continue
+        coords = np.array(nodes)
+        centroid = (float(coords[:, 0].mean()), float(coords[:, 1].mean()))
+        H.add_node(centroid, level=1, ci=idx[0], cj=idx[1], size=len(nodes))
+        for n in nodes:
+            lift[n] = centroid
+
+    for u, v in G.edges():
+        a, b = lift[u], lift[v]
+        if a != b and not H.has_edge(a, b):
+            d = float(haversine_distance(a[1], a[0], b[1], b[0]))
+            H.add_edge(a, b, weight=d, distance=d)
+
+    print(f"Hierarchy: {G.number_of_nodes()} -> {H.number_of_nodes()} nodes")
+    return H
+
+def load_hierarchical_graph(file_path):
+    """Load a hierarchy saved with save_hierarchical_graph"""
+    return load_navigation_graph(file_path)
+
+def save_hierarchical_graph(H, file_path):
+    nx.write_graphml(H, file_path)
+
+def hierarchy_index(G, H):
+    """Map every full-resolution node of G to its node in H"""
+    cell_deg = H.graph['cell_deg']
+    cell_node = {(d['ci'], d['cj']): n for n, d in H.nodes(data=True) if d.get('level') == 1}
+    lift = {}
+    for n in G.nodes():
+        if H.nodes.get(n, {}).get('level') == 0:
+            lift[n] = n
+        else:
+            lift[n] = cell_node.get(cell_index(n, cell_deg))
+    return lift
+
+# ---------------------- Coarse-to-Fine Routing ----------------------
+
+def coarse_route(H, lift, start_node, end_node):
+    """A* on the hierarchy; returns the centerline and local grid spacing (km) per point"""
+    def heuristic(a, b):
+        return float(haversine_distance(a[1], a[0], b[1], b[0]))
+
+    path = nx.astar_path(H, lift[start_node], lift[end_node], heuristic=heuristic, weight='distance')
+    spacing_deg = {0: H.graph['grid_step'], 1: H.graph['cell_deg']}
+    spacing_km = [spacing_deg[H.nodes[n].get('level', 0)] * KM_PER_DEGREE for n in path]
+    return [start_node] + path + [end_node], [spacing_km[0]] + spacing_km + [spacing_km[-1]]
+
+def route_corridor(G, H, lift, tree, node_array, start_node, end_node, variability=None,
+                   max_nodes=60000, attempts=3):
+    """Coarse route on H, then an adaptive corridor on G that connects start and end.
+
+    variability, if given, maps the (lon, lat) centerline points to 0-1 weather
+    variability scores used to widen the corridor. The corridor is widened and retried when
+    it does not connect the endpoints.
+    """
+    centerline, spacing_km = coarse_route(H, lift, start_node, end_node)
+    scores = variability(centerline) if variability else None
+
+    radius_factor = 1.5
+    for _ in range(attempts):
+        subgraph = build_adaptive_subgraph(
+            G, tree, node_array, centerline, spacing_km, scores,
+            radius_factor=radius_factor, max_nodes=max_nodes
+        )
+        if nx.has_path(subgraph, start_node, end_node):
+            return subgraph
+        radius_factor *= 2
+        max_nodes *= 2
+    raise nx.NetworkXNoPath(f"No corridor connects {start_node} and {end_node}")
+
+if __name__ == "__main__":
+    # Offline: python multires_graph.py grid.graphml grid_coarse.graphml [coarse_factor]
+    G = load_navigation_graph(sys.argv[1])
+    factor = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    save_hierarchical_graph(build_hierarchical_graph(G, coarse_factor=factor), sys.argv[2])
+    print(f"Hierarchy saved to {sys.argv[2]}")
@@ -1,24 +1,51 @@
-import sys
-import networkx as nx
-from geopy.distance import geodesic  # Import geodesic function
-from smooth import bspline_smooth
-from tqdm import tqdm
+import time
+_import_start = time.perf_counter()
+
 import asyncio
-import websockets
 import json
-import time
+import os
+import threading
+import uuid
+from collections import OrderedDict
+import networkx as nx
 import numpy as np
-from collections import defaultdict
-from datetime import datetime
+import websockets
 from math import radians, sin, cos, sqrt, atan2
-from cost_calculation import combined_cost, calculate_weather_cost
-from weather_api import fetch_weather_data, fetch_weather_marine_data
+from cost_calculation import combined_cost, build_weather_arrays
+from vessel_profiles import compile_cost_kernel, weather_epoch
+from weather_api import batch_fetch_weather_data, snap_to_weather_cells, weather_cell_sites, WEATHER_CELL_DEG
+from weather_store import weather_store
+from route_store import RouteStore
+from weather_prefetch import WeatherPrefetcher, load_regions, region_locations
 from graph_loader import load_navigation_graph, build_spatial_index, find_nearest_water_node
-from build_subgraph import build_subgraph
-from plot import plot_subgraph
+from route_encoding import encode_final_compact
+from reroute_session import RerouteSession
+from snapping import SnappingService
+from multires_graph import load_hierarchical_graph, save_hierarchical_graph, build_hierarchical_graph
+from multires_graph import hierarchy_index, route_corridor
+# Plotting (Plotly), smoothing (SciPy/Shapely) and alternative routes (SciPy)
+# are imported where they are used so they stay off the startup path.
+
+startup_times = {'imports': time.perf_counter() - _import_start}
 
 weather_data = {}
 marine_data = {}
+corridor_weather_cache = OrderedDict()  # (epoch, locations) -> arrays, least recently used first
+CORRIDOR_WEATHER_CACHE_SIZE = 8
+corridor_weather_lock = threading.Lock()
+route_store = RouteStore()
+def snapshot_weather():
+    """Drop expired weather and write entries fetched since the last snapshot to disk"""
+    weather_store.prune()
+    route_store.save_weather(weather_store)
+
+prefetcher = WeatherPrefetcher(on_refresh=snapshot_weather)
+
+GRAPH_PATH = "E:/grid_based_ship_routes/Backend/grid_based_ship_routes.graphml"
+HIERARCHY_PATH = "E:/grid_based_ship_routes/Backend/grid_based_ship_routes_coarse.graphml"
+routing_state = {}
+SUBGRAPH_DUMP_DIR = os.environ.get("SUBGRAPH_DUMP_DIR")  # Set to write each request's corridors as GraphML
+routing_state_lock = threading.Lock()
 
 # Radius of Earth in nautical miles
 R_NM = 3440.065
@@ -47,27 +74,6 @@ def calculate_total_nautical_distance(path):
         total_distance += dist
     return total_distance
 
-class RateLimiter:
-    def __init__(self, max_calls, period):
-        self.max_calls = max_calls
-        self.period = period
-        self.calls = []
-
-    def wait(self):
-        """Block until we can make another API call"""
-        now = time.time()
-        # Remove expired calls
-        self.calls = [t for t in self.calls if now - t < self.period]
-        
-        if len(self.calls) >= self.max_calls:
-            oldest = self.calls[0]
-            sleep_time = self.period - (now - oldest)
-            if sleep_time > 0:
-                print(f"Rate limit reached. Sleeping {sleep_time:.1f} seconds")
-                time.sleep(sleep_time)
-            self.calls = []
-        self.calls.append(time.time())
-
 def _calculate_geographic_bearing(pointA, pointB):
     lat1, lon1 = np.radians(pointA[1]), np.radians(pointA[0])
     lat2, lon2 = np.radians(pointB[1]), np.radians(pointB[0])
@@ -78,219 +84,364 @@ def _calculate_geographic_bearing(pointA, pointB):
     initial_bearing = np.arctan2(x, y)
     return (np.degrees(initial_bearing) + 360) % 360
 
-def batch_fetch_weather_data(locations, batch_size=100):
-    """Fetch weather and marine data in batches with rate limiting"""
-    weather_results = {}
-    marine_results = {}
-
-    batch_count = 0
-    minute_start_time = None
-
-    # Process in batches
-    for i in range(0, len(locations), batch_size):
-        if batch_count % 5 == 0:
-            minute_start_time = time.time()
-
-        batch = locations[i:i+batch_size]
-        lats = [loc[0] for loc in batch]
-        lons = [loc[1] for loc in batch]
-
-        # Fetch weather data
-        weather_data = fetch_weather_data(lats, lons)
-
-        # Fetch marine data
-        marine_data = fetch_weather_marine_data(lats, lons)
-
-        # Store results with location as key
-        for j, loc in enumerate(batch):
-            weather_results[loc] = weather_data[j] if j < len(weather_data) else {}
-            marine_results[loc] = marine_data[j] if j < len(marine_data) else {}
-
-        batch_count += 1
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Processed batch {batch_count}/{(len(locations) + batch_size - 1) // batch_size}")
-
-        time.sleep(11)
-
-    return weather_results, marine_results
-
-def update_subgraph_weights(subgraph, start_node, end_node):
-    """Update edge weights with weather-aware costs using target node's weather data"""
+def update_subgraph_weights(subgraph, start_node, end_node, vessel="default",
+                            cell_deg=WEATHER_CELL_DEG, bearing_bucket_deg=5, cell_sites=None):
+    """Update edge weights with weather-aware costs using target node's weather data.
+
+    Weather penalties come from the cached cost kernel of the vessel profile;
+    edges beyond the profile's hard limits are removed as impassable. Target
+    nodes are grouped into weather cells of cell_deg degrees that share one
+    fetch, and the kernel runs once per (cell, bearing bucket) rather than per
+    edge. cell_deg=None or bearing_bucket_deg=None evaluates exactly. Each cell
+    is fetched at a water node: from cell_sites (weather_cell_sites over the
+    full graph, for the same cell_deg) or else the corridor node nearest its
+    centre.
+    """
     # Calculate total distance for normalization
     try:
         total_distance = nx.shortest_path_length(subgraph, start_node, end_node, weight='distance')
     except nx.NetworkXNoPath:
         total_distance = float('inf')
     
-    # Precompute remaining distances from each node to destination
-    remaining_distances = {}
-    for node in subgraph.nodes():
+    # Remaining distance from every node to the destination in one reverse Dijkstra
+    remaining_distances = nx.single_source_dijkstra_path_length(
+        subgraph.reverse(copy=False), end_node, weight='distance'
+    )
+
+    # Target node location and bearing for each edge
+    edges = list(subgraph.edges())
+    u_coords = np.array([u for u, _ in edges])
+    v_coords = np.array([v for _, v in edges])
+    # Bearing from u to v using (lat, lon) tuples
+    bearings = _calculate_geographic_bearing(u_coords[:, ::-1].T, v_coords[:, ::-1].T)
+
+    # Weather arrays per weather cell, shared by every vessel profile
+    cell_lats, cell_lons = snap_to_weather_cells(v_coords[:, 1], v_coords[:, 0], cell_deg)
+    edge_cells = list(zip(cell_lats.tolist(), cell_lons.tolist()))
+    sites = weather_cell_sites(subgraph.nodes(), cell_deg)
+    if cell_sites:
+        sites.update((cell, cell_sites[cell]) for cell in sites if cell in cell_sites)
+    edge_sites = [sites[cell] for cell in edge_cells]
+    location_weather, location_index = corridor_weather_arrays(edge_sites)
+    cell_idx = np.array([location_index[site] for site in edge_sites])
+
+    # Evaluate the cost kernel once per (cell, bearing bucket) and scatter back to edges
+    if bearing_bucket_deg:
+        n_buckets = int(round(360 / bearing_bucket_deg))
+        buckets = np.round(bearings / bearing_bucket_deg).astype(int) % n_buckets
+        keys, inverse = np.unique(cell_idx * n_buckets + buckets, return_inverse=True)
+        key_cells, key_bearings = keys // n_buckets, (keys % n_buckets) * bearing_bucket_deg
+    else:
+        key_cells, key_bearings, inverse = cell_idx, bearings, np.arange(len(edges))
+    key_weather = {field: values[key_cells] for field, values in location_weather.items()}
+
+    kernel = compile_cost_kernel(vessel)
+    key_penalties, key_passable = kernel(key_weather, key_bearings)
+    penalties, passable = key_penalties[inverse.ravel()], key_passable[inverse.ravel()]
+    print(f"{len(edges)} edges -> {len(location_index)} weather cells, {len(key_cells)} cost evaluations")
+
+    blocked = []
+    for (u, v), weather_penalty, ok in zip(edges, penalties, passable):
+        data = subgraph[u][v]
+        if not ok:
+            blocked.append((u, v))
+            continue
         try:
-            remaining_distances[node] = nx.shortest_path_length(subgraph, node, end_node, weight='distance')
-        except nx.NetworkXNoPath:
-            remaining_distances[node] = float('inf')
-
-    # Collect all unique target node locations and bearings for each edge
-    edge_locations = {}
-    bearings = {}
-    
-    for u, v, data in subgraph.edges(data=True):
-        # Target node's coordinates (lat, lon)
-        target_lat = v[1]
-        target_lon = v[0]
-        edge_locations[(u, v)] = (target_lat, target_lon)
-        
-        # Calculate bearing from u to v using (lat, lon) tuples
-        u_lat, u_lon = u[1], u[0]
-        v_lat, v_lon = v[1], v[0]
-        bearing = _calculate_geographic_bearing((u_lat, u_lon), (v_lat, v_lon))
-        bearings[(u, v)] = bearing
-
-    # Batch fetch weather data for all unique target locations
-    unique_locations = list(set(edge_locations.values()))
-    weather_data, marine_data = batch_fetch_weather_data(unique_locations)
-    
-    # Create location to edges mapping
-    location_to_edges = defaultdict(list)
-    for edge, loc in edge_locations.items():
-        location_to_edges[loc].append(edge)
-
-    # Update all edges with weather data from their target node's location
-    for loc in unique_locations:
-        current_weather = weather_data.get(loc, {})
-        current_marine = marine_data.get(loc, {})
-        edges = location_to_edges[loc]
-        for (u, v) in edges:
-            try:
-                bearing = bearings[(u, v)]
-                weather_penalty = calculate_weather_cost(
-                    {'weather': current_weather, 'marine': current_marine},
-                    bearing
-                )
-                print(weather_penalty)
-                remaining = remaining_distances.get(v, float('inf'))
-                data = subgraph[u][v]
-                original_weight = data.get('original_weight', data['weight'])
-                data['original_weight'] = original_weight  # Preserve original
-                cost = combined_cost(
-                    original_weight,
-                    remaining,
-                    weather_penalty,
-                    0,  # direction_penalty (if used)
-                    total_distance
-                )
-
-                import math
-
-                if math.isnan(cost):
-                    data['weight'] = 0
-                else:
-                    data['weight'] = cost
-                print(cost)
-                
-
-            except Exception as e:
-                print(f"Error processing edge ({u}-{v}): {str(e)}")
-                # Fallback to original weight on error
-                data['weight'] = data.get('original_weight', original_weight)
+            remaining = remaining_distances.get(v, float('inf'))
+            original_weight = data.get('original_weight', data['weight'])
+            data['original_weight'] = original_weight  # Preserve original
+            data['weather_penalty'] = float(weather_penalty)
+            cost = combined_cost(
+                original_weight,
+                remaining,
+                weather_penalty,
+                0,  # direction_penalty (if used)
+                total_distance
+            )
+            data['weight'] = 0 if np.isnan(cost) else float(cost)
+        except Exception as e:
+            print(f"Error processing edge ({u}-{v}): {str(e)}")
+            # Fallback to original weight on error
+            data['weight'] = data.get('original_weight', data.get('weight', 0))
+
+    subgraph.remove_edges_from(blocked)
+    print(f"Weighted {len(edges)} edges for '{vessel}', {len(blocked)} impassable")
     return subgraph
 
-async def handle_navigation(websocket):
+def corridor_weather_arrays(locations):
+    """Weather arrays per (epoch, location set), kept for the most recent corridors, plus a location index"""
+    unique_locations = sorted(set(locations))
+    prefetcher.record_request(unique_locations)
+    key = (weather_epoch(), tuple(unique_locations))
+    location_index = {loc: i for i, loc in enumerate(unique_locations)}
+    # Route requests and sessions call this from worker threads
+    with corridor_weather_lock:
+        arrays = corridor_weather_cache.get(key)
+        if arrays is not None:
+            corridor_weather_cache.move_to_end(key)
+    if arrays is None:
+        weather_results, marine_results = batch_fetch_weather_data(unique_locations)
+        arrays = build_weather_arrays(unique_locations, weather_results, marine_results)
+        with corridor_weather_lock:
+            corridor_weather_cache[key] = arrays
+            while len(corridor_weather_cache) > CORRIDOR_WEATHER_CACHE_SIZE:
+                corridor_weather_cache.popitem(last=False)
+    return arrays, location_index
+
+def load_or_build_hierarchy(G):
+    """Coarse hierarchy from HIERARCHY_PATH, built and saved in-process when the file is missing"""
+    if os.path.exists(HIERARCHY_PATH):
+        return load_hierarchical_graph(HIERARCHY_PATH)
+    print(f"{HIERARCHY_PATH} not found, building the hierarchy in-process")
+    H = build_hierarchical_graph(G)
     try:
-        message = await websocket.recv()
-        data = json.loads(message)
-        print(data)
-        start_coords = tuple(data["start"])  # Converts list to tuple (lat, lon)
-        end_coords = tuple(data["end"])      # Converts list to tuple (lat, lon)
-        # Load graph with node parsing
-        G = load_navigation_graph(
-            "E:/grid_based_ship_routes/Backend/grid_based_ship_routes.graphml"
-        )
-
-        # Input coordinates (Mumbai to Cape Town)
-        start = (start_coords[1],start_coords[0])
-        end = (end_coords[1],end_coords[0])
-        
-        # Build spatial index and node array
-        tree, node_array = build_spatial_index(G)
-
-        # Get nearest navigable nodes
-        start_node = find_nearest_water_node(G, start, tree)
-        end_node = find_nearest_water_node(G, end, tree)
-
-        # Calculate optimal path using A*
-        a_star_path = nx.astar_path(G, start_node, end_node, weight='weight')
-
-        # Build and plot optimized subgraph
-        subgraph = build_subgraph(G, tree, node_array, a_star_path)
-        subgraph = subgraph.to_directed()  # Ensure directed graph
-        output_path = "subgraph.graphml"
+        save_hierarchical_graph(H, HIERARCHY_PATH)
+    except OSError as e:
+        print(f"Could not save hierarchy: {e}")
+    return H
+
+def get_routing_state():
+    """Graph, spatial index, coarse hierarchy and land index, loaded once per process"""
+    with routing_state_lock:
+        if not routing_state:
+            from land_index import build_land_index
+            G = load_navigation_graph(GRAPH_PATH)
+            tree, node_array = build_spatial_index(G)
+            H = load_or_build_hierarchy(G)
+            routing_state.update(G=G, tree=tree, node_array=node_array, H=H, lift=hierarchy_index(G, H),
+                                 snapper=SnappingService(G), land_tree=build_land_index(G),
+                                 cell_sites=weather_cell_sites(G.nodes()))
+    return routing_state
+
+def build_weighted_corridor(start_node, end_node, vessel="default", dump_prefix=None):
+    """Coarse route, adaptive corridor and weather weights between two graph nodes.
+
+    With dump_prefix, the raw and weighted corridors are written to
+    <dump_prefix>subgraph.graphml and <dump_prefix>optimized_subgraph.graphml.
+    """
+    state = get_routing_state()
+
+    # Route on the coarse hierarchy, then refine inside an adaptive corridor
+    # that widens where the stored weather is variable
+    subgraph = route_corridor(
+        state['G'], state['H'], state['lift'], state['tree'], state['node_array'], start_node, end_node,
+        variability=weather_store.variability
+    )
+    subgraph = subgraph.to_directed()  # Ensure directed graph
+    if dump_prefix:
+        output_path = f"{dump_prefix}subgraph.graphml"
         nx.write_graphml(subgraph, output_path)
         print(f"Subgraph saved to {output_path}")
-        # plot_subgraph(subgraph, a_star_path)
-        
-        # After initial subgraph creation
-        print("Updating edge weights with weather data...")
-        optimized_subgraph = update_subgraph_weights(subgraph.copy(), start_node, end_node)
-        
+    # plot_subgraph(subgraph, a_star_path)
+
+    # After initial subgraph creation
+    print("Updating edge weights with weather data...")
+    optimized_subgraph = update_subgraph_weights(
+        subgraph.copy(), start_node, end_node, vessel, cell_sites=state['cell_sites']
+    )
+
+    if dump_prefix:
         # Save optimized subgraph
-        nx.write_graphml(optimized_subgraph, "optimized_subgraph.graphml")
+        output_path = f"{dump_prefix}optimized_subgraph.graphml"
+        nx.write_graphml(optimized_subgraph, output_path)
         print(f"Optimized Subgraph saved to {output_path}")
+    return optimized_subgraph
+
+async def handle_reroute_session(websocket, data):
+    """Long-lived session: the client streams {"type": "position"} updates and gets
+    an 'update' message whenever the best route changes meaningfully"""
+    state = await asyncio.to_thread(get_routing_state)
+    vessel = data.get("vessel", "default")
+    end = (data["end"][1], data["end"][0])
+    end_node = find_nearest_water_node(state['G'], end, state['tree'])
+
+    def rebuild(position):
+        start_node = state['snapper'].snap([position], target=end)[0]['node']
+        return build_weighted_corridor(start_node, end_node, vessel), start_node
+
+    async def send_route(path):
+        route = [(node[1], node[0]) for node in path]
+        await websocket.send(json.dumps({
+            'type': 'update',
+            'path': route,
+            'distance': calculate_total_nautical_distance(path) * 1.852  # (lon, lat) nodes
+        }))
+
+    # Routing work runs in threads so one process can serve many sessions
+    start = (data["start"][1], data["start"][0])
+    session = await asyncio.to_thread(RerouteSession, rebuild, start, end_node)
+    await send_route(session.path)
+
+    async for message in websocket:
+        update = json.loads(message)
+        if update.get("type") != "position":
+            continue
+        lat, lon = update["position"]
+        path = await asyncio.to_thread(session.update, (lon, lat))
+        if path:
+            await send_route(path)
+
+async def handle_snap(websocket, data):
+    """Batch snap {"points": [[lat, lon], ...], "target": [lat, lon]} without routing"""
+    snapper = (await asyncio.to_thread(get_routing_state))['snapper']
+    points = [(lon, lat) for lat, lon in data["points"]]
+    target = (data["target"][1], data["target"][0]) if data.get("target") else None
+    results = await asyncio.to_thread(snapper.snap, points, target)
+    await websocket.send(json.dumps({
+        'type': 'snap',
+        'results': [
+            {
+                'coordinate': [lat, lon],
+                'node': [r['node'][1], r['node'][0]],
+                'distance': round(r['distance_km'], 3),
+                'reachable': r['reachable']
+            }
+            for (lat, lon), r in zip(data["points"], results)
+        ]
+    }))
+
+def plan_route(data):
+    """Route, smooth and describe one request; blocking, so handlers run it in a worker thread"""
+    start_coords = tuple(data["start"])  # Converts list to tuple (lat, lon)
+    end_coords = tuple(data["end"])      # Converts list to tuple (lat, lon)
+    # Graph and spatial index stay loaded between requests
+    state = get_routing_state()
+    G, tree = state['G'], state['tree']
+
+    # Input coordinates (Mumbai to Cape Town)
+    start = (start_coords[1],start_coords[0])
+    end = (end_coords[1],end_coords[0])
+
+    # Get nearest navigable nodes, keeping the start in the destination's component
+    end_node = find_nearest_water_node(G, end, tree)
+    start_node = state['snapper'].snap([start], target=end)[0]['node']
+
+    vessel = data.get("vessel", "default")
+    # Corridor dumps are opt-in and per request, since requests run concurrently
+    dump_prefix = os.path.join(SUBGRAPH_DUMP_DIR, f"{uuid.uuid4().hex[:12]}_") if SUBGRAPH_DUMP_DIR else None
+    optimized_subgraph = build_weighted_corridor(start_node, end_node, vessel, dump_prefix)
+
+    # Find optimized path using new weights
+    optimized_path = nx.dijkstra_path(optimized_subgraph, start_node, end_node, weight='weight')
+    print(optimized_path)
+
+    # Smooth the route, falling back to raw nodes wherever it would touch land
+    from path_smoothing import land_safe_smooth
+    smooth_path = land_safe_smooth(optimized_path, state['land_tree'])
+    # Plot optimized path
+    # plot_subgraph(optimized_subgraph, optimized_path)
     
-        # Find optimized path using new weights
-        optimized_path = nx.dijkstra_path(optimized_subgraph, start_node, end_node, weight='weight')
-        print(optimized_path)
+    Weatherpoints = []
+    for i in range(len(smooth_path)):
+        u = smooth_path[i]
+        
+        point_a = (u[1], u[0])  # (lat, lon)
+        Weatherpoints.append(point_a)
+
+    # Fetch fresh weather data for midpoints
+    weather_results, marine_results = batch_fetch_weather_data(Weatherpoints)
 
-        smooth_path = optimized_path
-        # Plot optimized path
-        # plot_subgraph(optimized_subgraph, optimized_path)
+    # Build weather info for midpoints
+    weather_info_list = []
+    for weatherpoint in Weatherpoints:
+        current_weather = weather_results.get(weatherpoint, {}).get("current", {})
+        current_marine = marine_results.get(weatherpoint, {}).get("current", {})
         
-        Weatherpoints = []
-        for i in range(len(smooth_path)):
-            u = smooth_path[i]
-            
-            point_a = (u[1], u[0])  # (lat, lon)
-            Weatherpoints.append(point_a)
-
-        # Fetch fresh weather data for midpoints
-        weather_results, marine_results = batch_fetch_weather_data(Weatherpoints)
-
-        # Build weather info for midpoints
-        weather_info_list = []
-        for weatherpoint in Weatherpoints:
-            current_weather = weather_results.get(weatherpoint, {}).get("current", {})
-            current_marine = marine_results.get(weatherpoint, {}).get("current", {})
-            
-            weather_info = {
-                'coordinate': [weatherpoint[0], weatherpoint[1]],
-                'wind_speed': current_weather.get('wind_speed_10m', 'N/A'),
-                'wind_direction': current_weather.get('wind_direction_10m', 'N/A'),
-                'wave_height': current_marine.get('wave_height', 'N/A'),
-                'wave_dir': current_marine.get('wave_direction', 'N/A'),
-                'current_vel': current_marine.get('ocean_current_velocity', 'N/A'),
-                'current_dir' : current_marine.get('ocean_current_direction', 'N/A')
+        weather_info = {
+            'coordinate': [weatherpoint[0], weatherpoint[1]],
+            'wind_speed': current_weather.get('wind_speed_10m', 'N/A'),
+            'wind_direction': current_weather.get('wind_direction_10m', 'N/A'),
+            'wave_height': current_marine.get('wave_height', 'N/A'),
+            'wave_dir': current_marine.get('wave_direction', 'N/A'),
+            'current_vel': current_marine.get('ocean_current_velocity', 'N/A'),
+            'current_dir' : current_marine.get('ocean_current_direction', 'N/A')
+        }
+        weather_info_list.append(weather_info)
+
+    print(weather_info_list)
+    # Smooth path and prepare response
+   
+    new_smooth_path = [(node[1], node[0]) for node in smooth_path]
+    distance = calculate_total_nautical_distance(smooth_path)  # (lon, lat) nodes
+    distance = distance*1.852
+    round(distance, 3)
+    response = {
+        'type': 'final',
+        'path': new_smooth_path,
+        'weather': weather_info_list,
+        'distance': distance
+    }
+
+    # Optional multi-objective mode: "routes": "pareto" or "alternatives"
+    routes_mode = data.get("routes")
+    if routes_mode in ("pareto", "alternatives"):
+        k = int(data.get("k", 5 if routes_mode == "pareto" else 3))
+        from alternatives import pareto_routes, alternative_routes
+        search = pareto_routes if routes_mode == "pareto" else alternative_routes
+        response['routes'] = [
+            {
+                'path': [(node[1], node[0]) for node in route['path']],
+                'distance': round(route['distance'], 3),
+                'weather': round(route['weather'], 3)
             }
-            weather_info_list.append(weather_info)
-
-        print(weather_info_list)
-        # Smooth path and prepare response
-       
-        new_smooth_path = [(node[1], node[0]) for node in smooth_path]
-        distance = calculate_total_nautical_distance(new_smooth_path)
-        distance = distance*1.852
-        round(distance, 3)
-        await websocket.send(json.dumps({
-            'type': 'final',
-            'path': new_smooth_path,
-            'weather': weather_info_list,
-            'distance': distance
-        }))
+            for route in search(optimized_subgraph, start_node, end_node, k=k)
+        ]
+
+    # Persist the delivered route for replay; weather is snapshotted by the prefetcher
+    response['route_id'] = route_store.save_route(
+        smooth_path, start=list(start_coords), end=list(end_coords),
+        vessel=vessel, distance=distance
+    )
+    return response
+
+async def handle_navigation(websocket):
+    try:
+        message = await websocket.recv()
+        data = json.loads(message)
+        print(data)
+        if data.get("type") == "session":
+            await handle_reroute_session(websocket, data)
+            return
+        if data.get("type") == "snap":
+            await handle_snap(websocket, data)
+            return
+
+        # Routing, weather fetches and rate-limit waits stay off the event loop
+        response = await asyncio.to_thread(plan_route, data)
+
+        # Clients that ask for "encoding": "compact" get a binary frame, everyone else JSON
+        if data.get("encoding") == "compact":
+            await websocket.send(encode_final_compact(response))
+        else:
+            await websocket.send(json.dumps(response))
     except Exception as e:
         await websocket.send(json.dumps({'type': 'error', 'message': str(e)}))
         raise
 
+def resolve_region_cells(regions):
+    """Weather cell sites for the prefetch regions; loads the routing state if needed"""
+    state = get_routing_state()
+    return region_locations(state['G'].nodes(), regions, state['cell_sites'])
+
 async def main():
+    # Come back warm: reload weather snapshots that have not expired yet
+    step_start = time.perf_counter()
+    print(f"Loaded {route_store.warm(weather_store)} cached weather locations")
+    startup_times['weather warm-up'] = time.perf_counter() - step_start
+
+    # Keep weather warm for configured regions and frequently routed locations.
+    # The graph loads in the prefetcher's first cycle or on the first request.
+    step_start = time.perf_counter()
+    regions = load_regions()
+    if regions:
+        prefetcher.resolve_regions = lambda: resolve_region_cells(regions)
+    startup_times['prefetch config'] = time.perf_counter() - step_start
+
     print("WebSocket server is starting on ws://localhost:5000")
     async with websockets.serve(handle_navigation, "localhost", 5000):
+        startup_times['total'] = time.perf_counter() - _import_start
+        print("Startup: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_times.items()))
+        asyncio.create_task(prefetcher.run())
         await asyncio.Future()  # Run forever
 
 if __name__ == "__main__":
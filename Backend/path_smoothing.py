@@ -1,21 +1,125 @@
-from shapely.geometry import LineString
-from geopy.distance import geodesic
+import numpy as np
+from smooth import bspline_smooth, bspline_segments
+from land_index import segments_crossing_land
 
-def smooth_path(path, G, tolerance=50):
-    """Simplify path using Ramer-Douglas-Peucker algorithm"""
+EARTH_RADIUS_M = 6371000
+
+def _project(coords):
+    """Local equirectangular projection of (lon, lat) coordinates to meters"""
+    coords = np.asarray(coords, dtype=float)
+    lon = np.unwrap(np.radians(coords[:, 0]))  # Continuous across the antimeridian
+    lat = np.radians(coords[:, 1])
+    return np.column_stack((lon * np.cos(lat.mean()), lat)) * EARTH_RADIUS_M
+
+def _unwrap_lons(coords):
+    """(lon, lat) array with longitudes made continuous across the antimeridian"""
+    coords = np.array(coords, dtype=float)
+    coords[:, 0] = np.unwrap(coords[:, 0], period=360)
+    return coords
+
+def _wrap_lons(coords):
+    """(lon, lat) array with longitudes back in [-180, 180)"""
+    coords = np.array(coords, dtype=float)
+    coords[:, 0] = (coords[:, 0] + 180) % 360 - 180
+    return coords
+
+def _segment_distances(points, a, b):
+    """Distance from each point to every segment a[j]-b[j], shape (len(points), len(a))"""
+    ab = b - a
+    length_sq = np.maximum((ab ** 2).sum(axis=1), 1e-12)
+    ap = points[:, None, :] - a[None, :, :]
+    t = np.clip((ap * ab[None, :, :]).sum(axis=2) / length_sq, 0, 1)
+    closest = a[None, :, :] + t[:, :, None] * ab[None, :, :]
+    return np.linalg.norm(points[:, None, :] - closest, axis=2)
+
+def rdp_indices(xy, tolerance):
+    """Indices of the vertices kept by Ramer-Douglas-Peucker"""
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(xy) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        d = _segment_distances(xy[i + 1:j], xy[i:i + 1], xy[j:j + 1])[:, 0]
+        k = int(np.argmax(d))
+        if d[k] > tolerance:
+            keep[i + 1 + k] = True
+            stack += [(i, i + 1 + k), (i + 1 + k, j)]
+    return np.flatnonzero(keep)
+
+def max_deviation(coords, path):
+    """Largest distance in meters from any of coords to the polyline through path"""
+    xy = _project(list(path) + list(coords))
+    line, points = xy[:len(path)], xy[len(path):]
+    return float(_segment_distances(points, line[:-1], line[1:]).min(axis=1).max())
+
+def smooth_path(path, G=None, tolerance=50, method="rdp", tree=None):
+    """Simplify or smooth a node path (list of (lon, lat) nodes) within a land-safety tolerance.
+
+    method="rdp" keeps a subset of the original nodes. method="bspline" fits
+    smooth.bspline_smooth through the RDP vertices and returns (lon, lat)
+    points, falling back to the RDP nodes when the curve strays more than
+    tolerance meters from the original path. Passing the spatial index from
+    graph_loader.build_spatial_index snaps the B-spline back onto graph nodes.
+    """
     if len(path) < 3:
-        return path
-    
-    line = LineString([(G.nodes[node]['lon'], G.nodes[node]['lat']) for node in path])
-    simplified = line.simplify(tolerance/111000)  # Convert meters to degrees
-    
-    # Convert back to node sequence
-    smoothed_path = []
-    for point in simplified.coords:
-        nearest_node = min(G.nodes, key=lambda n: geodesic(
-            (G.nodes[n]['lat'], G.nodes[n]['lon']),
-            (point[1], point[0])
-        ).meters)
-        smoothed_path.append(nearest_node)
-        
-    return smoothed_path
\ No newline at end of file
+        return list(path)
+
+    xy = _project(path)
+    simplified = [path[i] for i in rdp_indices(xy, tolerance)]
+    if method == "rdp":
+        return simplified
+
+    curve = bspline_smooth(_unwrap_lons(simplified), smoothing_factor=0)
+    curve = [tuple(p) for p in _wrap_lons(curve)]
+    if max_deviation(curve, path) > tolerance:
+        return simplified
+    if tree is None:
+        return curve
+
+    _, idx = tree.query(curve, k=1)
+    snapped = []
+    for i in idx:
+        node = tree.nodes[i]
+        if not snapped or snapped[-1] != node:
+            snapped.append(node)
+    return snapped
+
+def land_safe_smooth(path, land_tree, tolerance=5000, method="bspline", samples_per_segment=5):
+    """Smooth a node path and keep every output segment clear of land.
+
+    RDP shortcuts that cross land_tree get their raw nodes back, then each
+    span of the B-spline is tested in one vectorized STRtree query. Spans that
+    touch land or stray more than tolerance meters from the raw path fall back
+    to the raw path between their vertices. The spline is fitted on unwrapped
+    longitudes so routes across the antimeridian stay short. Returns a list of
+    (lon, lat) points.
+    """
+    if len(path) < 3:
+        return list(path)
+
+    kept = list(rdp_indices(_project(path), tolerance))
+    shortcuts = [(path[i], path[j]) for i, j in zip(kept[:-1], kept[1:])]
+    for k in np.flatnonzero(segments_crossing_land(land_tree, shortcuts))[::-1]:
+        kept[k + 1:k + 1] = range(kept[k] + 1, kept[k + 1])
+    simplified = [path[i] for i in kept]
+    if method == "rdp":
+        return simplified
+
+    spans = bspline_segments(_unwrap_lons(simplified), smoothing_factor=0, samples_per_segment=samples_per_segment)
+    spans = [_wrap_lons(span) for span in spans]
+    segments = np.concatenate([np.stack((span[:-1], span[1:]), axis=1) for span in spans])
+    span_ids = np.repeat(np.arange(len(spans)), [len(span) - 1 for span in spans])
+    blocked = set(span_ids[segments_crossing_land(land_tree, segments)])
+    blocked.update(k for k, span in enumerate(spans)
+                   if k not in blocked and max_deviation(span, path[kept[k]:kept[k + 1] + 1]) > tolerance)
+
+    smoothed = []
+    for k, span in enumerate(spans):
+        if k in blocked:
+            smoothed += path[kept[k]:kept[k + 1]]
+        else:
+            smoothed += [tuple(p) for p in span[:-1]]
+    smoothed.append(path[-1])
+    return smoothed
@@ -1,4 +1,6 @@
+import numpy as np
 import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
 
 def plot_subgraph(subgraph, a_star_path,save_path="navigation_map.html" ):
     """Visualize subgraph and A* path using Plotly on a 3D globe"""
@@ -49,4 +51,94 @@ def plot_subgraph(subgraph, a_star_path,save_path="navigation_map.html" ):
         height=800
     )
     fig.show()
-    fig.write_html(save_path)
\ No newline at end of file
+    fig.write_html(save_path)
+
+# ---------------------- Large Subgraph Rendering ----------------------
+
+def _line_arrays(segments):
+    """(n, 2, 2) segments -> flat lon/lat arrays with NaN gaps between segments"""
+    gap = np.full((len(segments), 1), np.nan)
+    lons = np.hstack((segments[:, :, 0], gap)).ravel()
+    lats = np.hstack((segments[:, :, 1], gap)).ravel()
+    return lons, lats
+
+def decimate_edges(segments, values, cell_deg):
+    """Snap segment endpoints to a cell_deg grid and merge duplicates, averaging their values"""
+    snapped = np.round(segments / cell_deg) * cell_deg
+    keep = np.any(snapped[:, 0] != snapped[:, 1], axis=1)
+    snapped, values = snapped[keep], values[keep]
+    unique, inverse = np.unique(snapped.reshape(len(snapped), 4), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    merged = np.bincount(inverse, weights=values) / np.bincount(inverse)
+    return unique.reshape(-1, 2, 2), merged
+
+def plot_subgraph_fast(subgraph, path=None, save_path="navigation_map.html", zoom=None,
+                       max_edges=20000, color_by=None, n_colors=8, webgl=False):
+    """Headless rendering of large subgraphs.
+
+    Edges are built with NumPy and aggregated on a grid that matches the zoom
+    level (web-map zoom, 0 = whole world), then coarsened further until at most
+    max_edges remain. color_by names an edge attribute (e.g.
+    'weight') to color edges in n_colors bins. webgl=True draws on a flat
+    Scattergl canvas instead of the orthographic globe. Writes save_path and
+    returns the figure without opening a browser.
+    """
+    edges = list(subgraph.edges(data=True))
+    segments = np.array([(u, v) for u, v, _ in edges], dtype=float).reshape(-1, 2, 2)
+    values = np.array([d.get(color_by, 0.0) if color_by else 0.0 for _, _, d in edges], dtype=float)
+    values = np.nan_to_num(values, posinf=0.0)
+
+    if zoom is not None:
+        cell_deg = 4 * 360 / (256 * 2 ** zoom)  # About 4 pixels at this zoom
+        segments, values = decimate_edges(segments, values, cell_deg)
+    else:
+        cell_deg = min(abs(np.diff(segments, axis=1)).max(), 1.0) if len(segments) else 1.0
+    # Coarsen further until the output fits max_edges, whatever the zoom
+    while len(segments) > max_edges:
+        cell_deg *= 1.5
+        segments, values = decimate_edges(segments, values, cell_deg)
+
+    scatter = go.Scattergl if webgl else go.Scattergeo
+    def trace(lons, lats, **kwargs):
+        return scatter(x=lons, y=lats, **kwargs) if webgl else scatter(lon=lons, lat=lats, **kwargs)
+
+    fig = go.Figure()
+    if color_by and len(segments):
+        bins = np.linspace(values.min(), values.max() + 1e-12, n_colors + 1)
+        labels = np.digitize(values, bins[1:-1])
+        colors = sample_colorscale('Turbo', np.linspace(0, 1, n_colors))
+        for b in range(n_colors):
+            mask = labels == b
+            if mask.any():
+                lons, lats = _line_arrays(segments[mask])
+                fig.add_trace(trace(lons, lats, mode='lines', line=dict(width=1, color=colors[b]),
+                                    name=f'{color_by} {bins[b]:.2f}-{bins[b + 1]:.2f}'))
+    else:
+        lons, lats = _line_arrays(segments)
+        fig.add_trace(trace(lons, lats, mode='lines', line=dict(width=0.5, color='gray'),
+                            name='Shipping Routes'))
+
+    if path:
+        coords = np.array(path, dtype=float)
+        fig.add_trace(trace(coords[:, 0], coords[:, 1], mode='lines+markers',
+                            line=dict(width=2, color='red'), marker=dict(size=4, color='red'),
+                            name='Optimal Path'))
+
+    if webgl:
+        fig.update_layout(xaxis_title='Longitude', yaxis=dict(title='Latitude', scaleanchor='x'))
+    else:
+        fig.update_layout(geo=dict(
+            projection_type='orthographic',
+            showland=True,
+            landcolor='rgb(100, 100, 100)',
+            oceancolor='rgb(0, 0, 80)',
+            showocean=True,
+            showcountries=True,
+            countrycolor='rgb(200, 200, 200)'
+        ))
+    fig.update_layout(title='Marine Navigation Network with Optimal Route', width=1200, height=800)
+
+    # Load plotly.js from the CDN instead of inlining ~3 MB into every file
+    fig.write_html(save_path, include_plotlyjs='cdn')
+    print(f"Rendered {len(segments)} of {len(edges)} edges to {save_path}")
+    return fig
@@ -0,0 +1,64 @@
+import networkx as nx
+from graph_loader import SpatialIndex
+from vessel_profiles import weather_epoch
+
+class RerouteSession:
+    """Warm routing state for one vessel under way.
+
+    Keeps a shortest-path tree towards the destination over the weighted
+    corridor, so a new position costs one spatial-index query plus walking
+    next hops. The corridor is rebuilt only when the vessel leaves it or the
+    weather epoch changes. rebuild(position) must return (corridor, start_node)
+    for a (lon, lat) position.
+    """
+
+    def __init__(self, rebuild, position, end_node, weight='weight', max_snap_km=60, min_change=0.1):
+        self.rebuild = rebuild
+        self.end_node = end_node
+        self.weight = weight
+        self.max_snap_km = max_snap_km
+        self.min_change = min_change
+        node = self._load(position)
+        self.path = self.route_from(node)
+
+    def _load(self, position):
+        corridor, start_node = self.rebuild(position)
+        self.epoch = weather_epoch()
+
+        # Shortest-path tree into the destination: next hop for every corridor node.
+        # Only the tree and an index over its nodes are kept, not the corridor itself.
+        pred, self.cost_to_go = nx.dijkstra_predecessor_and_distance(
+            corridor.reverse(copy=False), self.end_node, weight=self.weight
+        )
+        self.next_hop = {v: p[0] for v, p in pred.items() if p}
+        self.tree = SpatialIndex(self.cost_to_go)
+        return start_node
+
+    def route_from(self, node):
+        if node not in self.cost_to_go:
+            raise nx.NetworkXNoPath(f"No route from {node} to {self.end_node}")
+        path = [node]
+        while path[-1] != self.end_node:
+            path.append(self.next_hop[path[-1]])
+        return path
+
+    def snap(self, position):
+        """Nearest corridor node to a (lon, lat) position and its distance in km"""
+        dist, idx = self.tree.query([position], k=1)
+        return self.tree.nodes[idx[0]], dist[0]
+
+    def update(self, position):
+        """Return the new route if it changed meaningfully since the last one sent, else None"""
+        node, snap_km = self.snap(position)
+        if snap_km > self.max_snap_km or node not in self.cost_to_go or weather_epoch() != self.epoch:
+            node = self._load(position)
+            self.path = self.route_from(node)
+            return self.path
+
+        path = self.route_from(node)
+        previous = set(self.path)
+        changed = sum(n not in previous for n in path) / len(path)
+        if changed <= self.min_change:
+            return None  # Still following (a suffix of) the last route
+        self.path = path
+        return path
@@ -0,0 +1,46 @@
+import json
+import struct
+import numpy as np
+
+# Weather columns of the compact 'final' frame, in buffer order
+WEATHER_COLUMNS = ['wind_speed', 'wind_direction', 'wave_height', 'wave_dir', 'current_vel', 'current_dir']
+
+def encode_polyline(coords, precision=5):
+    """Google encoded polyline of (lat, lon) pairs"""
+    scaled = np.round(np.asarray(coords, dtype=float) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+
+    chunks = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+def _column(weather_info_list, key):
+    return np.array([
+        w[key] if isinstance(w.get(key), (int, float, np.floating)) else np.nan for w in weather_info_list
+    ], dtype='<f4')
+
+def encode_final_compact(response):
+    """Binary WebSocket frame for a 'final' response.
+
+    Layout: uint32 little-endian header length, UTF-8 JSON header padded to a
+    multiple of 4 bytes, then one little-endian float32 column per entry in
+    WEATHER_COLUMNS (NaN where missing). Paths are encoded polylines and
+    weather coordinates are implied by the path.
+    """
+    weather = response['weather']
+    header = {k: v for k, v in response.items() if k not in ('path', 'weather', 'routes')}
+    header['encoding'] = 'compact'
+    header['path'] = encode_polyline(response['path'])
+    header['weather'] = {'columns': WEATHER_COLUMNS, 'count': len(weather)}
+    if 'routes' in response:
+        header['routes'] = [dict(route, path=encode_polyline(route['path'])) for route in response['routes']]
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 4)
+    columns = b''.join(_column(weather, key).tobytes() for key in WEATHER_COLUMNS)
+    return struct.pack('<I', len(header_bytes)) + header_bytes + columns
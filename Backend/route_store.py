@@ -0,0 +1,135 @@
+import json
+import os
+import time
+import uuid
+import numpy as np
+from weather_store import WEATHER_TTL
+
+STORE_DIR = os.environ.get(
+    "ROUTE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "store")
+)
+SNAPSHOT_SECONDS = 3600  # Snapshot files are grouped by fetch hour
+
+def _save_npz(file_path, **arrays):
+    """Write atomically so readers never see a half-written snapshot"""
+    tmp_path = file_path + ".tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, file_path)
+
+class RouteStore:
+    """On-disk store of weather snapshots and computed routes for replay and warm restarts.
+
+    Layout under root:
+        weather/<hour>_<ms>.npz  columnar weather (lat, lon, fetched_at, fields) fetched in
+                                 that hour and new since the previous save, sorted by lat
+        routes/index.jsonl   one metadata record per route (time, bbox, vessel, distance)
+        routes/<id>.npz      float32 (lon, lat) path of a route
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.weather_dir = os.path.join(root, "weather")
+        self.routes_dir = os.path.join(root, "routes")
+        os.makedirs(self.weather_dir, exist_ok=True)
+        os.makedirs(self.routes_dir, exist_ok=True)
+        self.index_path = os.path.join(self.routes_dir, "index.jsonl")
+        self._saved_until = time.time()  # Older entries are on disk already or came from warm()
+
+    # ---------------------- Weather snapshots ----------------------
+
+    def save_weather(self, store, now=None):
+        """Snapshot store entries fetched since the last save, one part file per fetch hour"""
+        arrays = store.to_arrays(since=self._saved_until)
+        new = arrays['fetched_at'] > self._saved_until
+        if not new.any():
+            return 0
+        arrays = {k: v[new] for k, v in arrays.items()}
+        self._saved_until = float(arrays['fetched_at'].max())
+
+        stamp = int((now or time.time()) * 1000)
+        hours = (arrays['fetched_at'] // SNAPSHOT_SECONDS).astype(int)
+        for hour in np.unique(hours):
+            part = hours == hour
+            order = np.argsort(arrays['lat'][part], kind='stable')
+            _save_npz(os.path.join(self.weather_dir, f"{hour}_{stamp}.npz"),
+                      **{k: v[part][order] for k, v in arrays.items()})
+        return int(new.sum())
+
+    def _snapshot_files(self, start=None, end=None):
+        """Snapshot files whose fetch hour falls in [start, end]"""
+        lo = -np.inf if start is None else start // SNAPSHOT_SECONDS
+        hi = np.inf if end is None else end // SNAPSHOT_SECONDS
+        names = [name for name in os.listdir(self.weather_dir) if name.endswith(".npz") and ".tmp" not in name]
+        return sorted(name for name in names if lo <= int(name[:-4].split("_")[0]) <= hi)
+
+    def weather(self, bbox=None, start=None, end=None):
+        """Columnar weather inside bbox=(min_lon, min_lat, max_lon, max_lat) fetched in [start, end]"""
+        parts = []
+        for name in self._snapshot_files(start, end):
+            with np.load(os.path.join(self.weather_dir, name)) as snapshot:
+                arrays = dict(snapshot)
+            if bbox:
+                min_lon, min_lat, max_lon, max_lat = bbox
+                # Snapshots are sorted by latitude, so narrow by slice before masking
+                lo = np.searchsorted(arrays['lat'], min_lat, side='left')
+                hi = np.searchsorted(arrays['lat'], max_lat, side='right')
+                arrays = {k: v[lo:hi] for k, v in arrays.items()}
+                mask = (arrays['lon'] >= min_lon) & (arrays['lon'] <= max_lon)
+            else:
+                mask = np.ones(len(arrays['lat']), dtype=bool)
+            if start is not None:
+                mask &= arrays['fetched_at'] >= start
+            if end is not None:
+                mask &= arrays['fetched_at'] <= end
+            parts.append({k: v[mask] for k, v in arrays.items()})
+        if not parts:
+            return {}
+        return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+    def warm(self, store, max_age=WEATHER_TTL, now=None):
+        """Load snapshots still younger than max_age into a WeatherStore after a restart"""
+        now = now or time.time()
+        arrays = self.weather(start=now - max_age)
+        return store.load_arrays(arrays) if arrays else 0
+
+    # ---------------------- Routes ----------------------
+
+    def save_route(self, path, **meta):
+        """Store a (lon, lat) node path with metadata; returns the route id"""
+        coords = np.asarray(path, dtype=np.float32)
+        route_id = uuid.uuid4().hex[:12]
+        record = {
+            'id': route_id,
+            'created_at': time.time(),
+            'bbox': [float(coords[:, 0].min()), float(coords[:, 1].min()),
+                     float(coords[:, 0].max()), float(coords[:, 1].max())],
+            'points': len(coords),
+            **meta
+        }
+        _save_npz(os.path.join(self.routes_dir, f"{route_id}.npz"), path=coords)
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        return route_id
+
+    def routes(self, bbox=None, start=None, end=None):
+        """Route records created in [start, end] whose bbox intersects bbox"""
+        if not os.path.exists(self.index_path):
+            return []
+        records = []
+        with open(self.index_path) as f:
+            for line in f:
+                record = json.loads(line)
+                if start is not None and record['created_at'] < start:
+                    continue
+                if end is not None and record['created_at'] > end:
+                    continue
+                if bbox:
+                    r = record['bbox']
+                    if r[2] < bbox[0] or r[0] > bbox[2] or r[3] < bbox[1] or r[1] > bbox[3]:
+                        continue
+                records.append(record)
+        return records
+
+    def load_route(self, route_id):
+        with np.load(os.path.join(self.routes_dir, f"{route_id}.npz")) as data:
+            return [tuple(p) for p in data['path'].tolist()]
@@ -17,3 +17,18 @@ def bspline_smooth(path, smoothing_factor=0.5):
 
     # Return smoothed path as a list of (lon, lat) tuples
     return list(zip(smooth_points[0], smooth_points[1]))
+
+def bspline_segments(path, smoothing_factor=0.5, samples_per_segment=5):
+    """B-spline through path, split into one (lon, lat) point array per original segment."""
+    path = np.array(path)
+
+    if len(path) < 4:
+        return [path[i:i + 2] for i in range(len(path) - 1)]
+
+    tck, u = splprep([path[:, 0], path[:, 1]], s=smoothing_factor)
+
+    # Sample each parameter interval separately so segments map back to the input
+    return [
+        np.column_stack(splev(np.linspace(u[i], u[i + 1], samples_per_segment + 1), tck))
+        for i in range(len(path) - 1)
+    ]
@@ -0,0 +1,71 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from graph_loader import SpatialIndex, build_spatial_index
+
+class SnappingService:
+    """Batch snapping of arbitrary points to graph nodes that can reach a target.
+
+    Connected-component labels are computed once per graph. Each point is
+    matched against its k nearest nodes first; if none of them share the
+    target's component, an index over that component alone gives the exact
+    nearest reachable node.
+    """
+
+    def __init__(self, G, k=8):
+        self.index, _ = build_spatial_index(G)
+        self.k = min(k, len(self.index.nodes))
+        position = {n: i for i, n in enumerate(self.index.nodes)}
+        rows = [position[u] for u, _ in G.edges()]
+        cols = [position[v] for _, v in G.edges()]
+        n = len(self.index.nodes)
+        adjacency = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+        self.n_components, self.labels = connected_components(adjacency, directed=True, connection='weak')
+        self._component_indexes = {}
+        print(f"Snapping: {n} nodes in {self.n_components} components")
+
+    def _component_index(self, label):
+        if label not in self._component_indexes:
+            members = np.flatnonzero(self.labels == label)
+            self._component_indexes[label] = SpatialIndex([self.index.nodes[i] for i in members])
+        return self._component_indexes[label]
+
+    def component_of(self, coord):
+        """Component label of the node nearest to a (lon, lat) coordinate"""
+        _, idx = self.index.query([coord], k=1)
+        return int(self.labels[idx[0]])
+
+    def snap(self, coords, target=None):
+        """Snap (lon, lat) coords; with a target (lon, lat), only to nodes in the target's component.
+
+        Returns one dict per coord with the snapped node, snap distance in km,
+        the component of the nearest node overall and whether that nearest
+        node could already reach the target.
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        dist, idx = self.index.query(coords, k=self.k)
+        dist, idx = dist.reshape(len(coords), -1), idx.reshape(len(coords), -1)
+        label = None if target is None else self.component_of(target)
+
+        results = []
+        for i in range(len(coords)):
+            if label is None:
+                hit = 0
+            else:
+                matches = np.flatnonzero(self.labels[idx[i]] == label)
+                hit = matches[0] if len(matches) else None
+
+            if hit is not None:
+                node, distance = self.index.nodes[idx[i, hit]], dist[i, hit]
+            else:
+                component_index = self._component_index(label)
+                d, j = component_index.query(coords[i], k=1)
+                node, distance = component_index.nodes[j[0]], d[0]
+
+            results.append({
+                'node': node,
+                'distance_km': float(distance),
+                'component': int(self.labels[idx[i, 0]]),
+                'reachable': bool(label is None or hit == 0)
+            })
+        return results
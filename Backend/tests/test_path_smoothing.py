@@ -0,0 +1,40 @@
+import networkx as nx
+import numpy as np
+from land_index import build_land_index, segments_crossing_land
+from path_smoothing import land_safe_smooth, max_deviation
+from test_spatial_index import grid_graph
+
+def route_length_nm(path):
+    coords = np.radians(np.array(path))
+    dlon = np.diff(coords[:, 0])
+    lat1, lat2 = coords[:-1, 1], coords[1:, 1]
+    a = np.sin(np.diff(coords[:, 1]) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return float((2 * 3440.065 * np.arcsin(np.sqrt(a))).sum())
+
+def test_land_strip_has_no_gaps():
+    G = grid_graph(np.arange(4.0, 5.01, 0.5), np.arange(1.5, 2.51, 0.5))
+    G.remove_nodes_from([n for n in list(G) if n[0] == 4.5])
+    land = build_land_index(G)
+    crossing = [((4.0, 1.75), (5.0, 1.75)), ((4.0, 2.0), (5.0, 2.25))]
+    assert segments_crossing_land(land, crossing).all()
+    edges = np.array([(u, v) for u, v in G.edges()])
+    assert not segments_crossing_land(land, edges).any()
+
+def test_segments_crossing_land_across_antimeridian():
+    G = grid_graph(np.arange(170.25, 190, 0.5), np.arange(-9.75, 10, 0.5))
+    G.remove_nodes_from([n for n in list(G) if abs(n[0]) == 179.75 and n[1] > 0])
+    land = build_land_index(G)
+    # Same segment, wrapped and unwrapped, crossing the land at 180 degrees
+    segments = [((179.25, 2.25), (-179.25, 2.25)), ((179.25, 2.25), (180.75, 2.25)),
+                ((179.25, -2.25), (-179.25, -2.25))]
+    assert segments_crossing_land(land, segments).tolist() == [True, True, False]
+
+def test_smoothing_across_antimeridian_stays_short():
+    G = grid_graph(np.arange(160.25, 200, 0.5), np.arange(-63.75, -56, 0.5))
+    land = build_land_index(G)
+    path = nx.shortest_path(G, (170.25, -60.25), (-170.25, -58.25))
+    smoothed = land_safe_smooth(path, land)
+
+    assert all(abs(lon) >= 170 for lon, _ in smoothed)
+    assert route_length_nm(smoothed) < 1.05 * route_length_nm(path)
+    assert max_deviation(smoothed, path) <= 5000
@@ -0,0 +1,95 @@
+import networkx as nx
+import numpy as np
+import pytest
+from graph_loader import build_spatial_index, find_nearest_water_node, haversine_distance
+from build_subgraph import build_subgraph, build_adaptive_subgraph
+
+STEP = 0.5
+
+def wrap_lon(lon):
+    return round((lon + 180) % 360 - 180, 6)
+
+def grid_graph(lons, lats):
+    """8-connected (lon, lat) grid graph, joined across the antimeridian when it spans it"""
+    G = nx.Graph()
+    nodes = {(wrap_lon(lon), round(lat, 6)) for lon in lons for lat in lats}
+    for lon, lat in nodes:
+        for dlon, dlat in [(1, 0), (0, 1), (1, 1), (1, -1)]:
+            v = (wrap_lon(lon + dlon * STEP), round(lat + dlat * STEP, 6))
+            if v in nodes:
+                G.add_edge((lon, lat), v, weight=1.0)
+    return G
+
+def within(nodes, point, radius_km):
+    coords = np.array(nodes)
+    d = haversine_distance(point[1], point[0], coords[:, 1], coords[:, 0])
+    return {n for n, km in zip(nodes, d) if km <= radius_km}
+
+@pytest.fixture(scope="module")
+def pacific():
+    """Equatorial Pacific grid from 170E across the antimeridian to 170W"""
+    return grid_graph(np.arange(170.25, 190, STEP), np.arange(-9.75, 10, STEP))
+
+@pytest.fixture(scope="module")
+def southern_ocean():
+    """Southern Ocean grid around -67 latitude"""
+    return grid_graph(np.arange(-59.75, 60, STEP), np.arange(-71.75, -62, STEP))
+
+def test_nearest_node_across_antimeridian(pacific):
+    tree, _ = build_spatial_index(pacific)
+    assert find_nearest_water_node(pacific, (-179.95, 0.3), tree) == (-179.75, 0.25)
+    assert find_nearest_water_node(pacific, (179.9, 0.3), tree) == (179.75, 0.25)
+    # 180E and 180W are the same meridian
+    dist, _ = tree.query([(180.0, 0.25), (-180.0, 0.25)], k=1)
+    assert np.allclose(dist, dist[0]) and dist[0] < 30
+
+def test_radius_query_matches_haversine_across_antimeridian(pacific):
+    tree, _ = build_spatial_index(pacific)
+    point = (179.75, 0.25)
+    found = {tree.nodes[i] for i in tree.query_radius([point], 200)[0]}
+    assert found == within(list(pacific.nodes()), point, 200)
+    assert any(lon < 0 for lon, _ in found)
+
+def test_build_subgraph_across_antimeridian(pacific):
+    tree, node_array = build_spatial_index(pacific)
+    path = [(wrap_lon(lon), 0.25) for lon in np.arange(175.25, 185, STEP)]
+    subgraph = build_subgraph(pacific, tree, node_array, path, radius_km=150)
+
+    expected = set().union(*(within(list(pacific.nodes()), p, 150) for p in path))
+    assert set(subgraph.nodes()) == expected
+    route = nx.shortest_path(subgraph, path[0], path[-1])
+    # The corridor route crosses the antimeridian instead of going round the world
+    assert all(abs(lon) >= 175 for lon, _ in route)
+    assert len(route) == 20
+
+def test_adaptive_subgraph_across_antimeridian(pacific):
+    tree, node_array = build_spatial_index(pacific)
+    # Coarse centerline every 1.5 degrees, crossing 180 between 179.75E and 178.75W
+    centerline = [(wrap_lon(lon), 0.25) for lon in np.arange(172.25, 188, 3 * STEP)]
+    subgraph = build_adaptive_subgraph(pacific, tree, node_array, centerline, spacing_km=100,
+                                       min_radius_km=100, max_radius_km=300)
+    assert nx.has_path(subgraph, centerline[0], centerline[-1])
+    assert all(abs(lon) >= 170 for lon, _ in subgraph.nodes())
+    assert {(179.75, 0.25), (-179.75, 0.25)} <= set(subgraph.nodes())
+
+def test_polar_corridor_size_stays_bounded(southern_ocean):
+    equator = grid_graph(np.arange(-59.75, 60, STEP), np.arange(-4.75, 5, STEP))
+    radius_km = 300
+
+    def corridor_size(G, lat):
+        # Same path length in km at either latitude
+        tree, node_array = build_spatial_index(G)
+        path = [(0.25, lat), (0.25, lat + STEP), (0.25, lat + 2 * STEP)]
+        return build_subgraph(G, tree, node_array, path, radius_km=radius_km).number_of_nodes()
+
+    polar, equatorial = corridor_size(southern_ocean, -67.25), corridor_size(equator, -0.25)
+    # Nodes crowd by 1/cos(67) ~ 2.6x; the polar radius scaling keeps the corridor near equatorial size
+    assert polar < 1.5 * equatorial
+
+def test_adaptive_subgraph_respects_max_nodes(southern_ocean):
+    tree, node_array = build_spatial_index(southern_ocean)
+    centerline = [(lon, -66.75) for lon in np.arange(-49.75, 50, 5.0)]
+    subgraph = build_adaptive_subgraph(southern_ocean, tree, node_array, centerline, spacing_km=200,
+                                       min_radius_km=50, max_radius_km=700, max_nodes=3000)
+    assert subgraph.number_of_nodes() <= 3000 + len(centerline)
+    assert nx.has_path(subgraph, centerline[0], centerline[-1])
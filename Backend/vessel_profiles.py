@@ -0,0 +1,61 @@
+import json
+import os
+import time
+import numpy as np
+from functools import lru_cache
+from cost_calculation import alignment_penalty_array
+
+PROFILES_PATH = os.environ.get(
+    "VESSEL_PROFILES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vessel_profiles.json")
+)
+WEATHER_EPOCH_SECONDS = 3600  # Matches the weather cache expiry
+
+def weather_epoch(timestamp=None):
+    """Index of the weather refresh period a timestamp falls in"""
+    return int((timestamp or time.time()) // WEATHER_EPOCH_SECONDS)
+
+def load_profiles(file_path=PROFILES_PATH):
+    """Load the vessel profile registry from JSON or YAML"""
+    with open(file_path) as f:
+        if file_path.endswith((".yaml", ".yml")):
+            import yaml  # Optional, only needed for YAML registries
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def get_profile(name, file_path=PROFILES_PATH):
+    profiles = load_profiles(file_path)
+    if name not in profiles:
+        raise KeyError(f"Unknown vessel profile '{name}', expected one of {sorted(profiles)}")
+    return profiles[name]
+
+@lru_cache(maxsize=64)
+def compile_cost_kernel(name, file_path=PROFILES_PATH):
+    """Vectorized weather cost function for one vessel profile.
+
+    Cached per profile; weather only enters through the arrays. The returned kernel takes the arrays
+    from cost_calculation.build_weather_arrays plus edge bearings and returns
+    (penalty, passable). Edges that exceed a hard limit are not passable.
+    """
+    profile = get_profile(name, file_path)
+    thresholds, weights = profile["thresholds"], profile["weights"]
+    hard_limits = profile.get("hard_limits", {})
+
+    def kernel(arrays, bearings):
+        wind = np.nan_to_num(arrays['wind_speed'])
+        wave = np.nan_to_num(arrays['wave_height'])
+        current = np.nan_to_num(arrays['current_velocity'])
+        penalty = (
+            wind / thresholds['wind_speed'] * weights['wind_speed']
+            + alignment_penalty_array(arrays['wind_direction'], bearings) * weights['wind_alignment']
+            + wave / thresholds['wave_height'] * weights['wave_height']
+            + alignment_penalty_array(arrays['wave_direction'], bearings) * weights['wave_alignment']
+            + current / thresholds['current_velocity'] * weights['current_velocity']
+            + alignment_penalty_array(arrays['current_direction'], bearings) * weights['current_alignment']
+        )
+
+        passable = np.ones(len(penalty), dtype=bool)
+        for field, limit in hard_limits.items():
+            passable &= ~(arrays[field] > limit)  # Missing data never blocks an edge
+        return penalty, passable
+
+    return kernel
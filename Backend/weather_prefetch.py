@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from weather_api import batch_fetch_weather_data, weather_cell_sites
+from weather_store import weather_store
+
+REGIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prefetch_regions.json")
+
+def load_regions(file_path=REGIONS_PATH):
+    """Load [{"name": ..., "bbox": [min_lon, min_lat, max_lon, max_lat]}, ...]; empty if absent"""
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path) as f:
+        return json.load(f)
+
+def region_locations(nodes, regions, cell_sites=None):
+    """Weather cell sites (lat, lon) covering the (lon, lat) graph nodes inside any region"""
+    inside = []
+    for lon, lat in nodes:
+        for region in regions:
+            min_lon, min_lat, max_lon, max_lat = region["bbox"]
+            if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat:
+                inside.append((lon, lat))
+                break
+    if not inside:
+        return []
+    sites = weather_cell_sites(inside)
+    if cell_sites:
+        sites.update((cell, cell_sites[cell]) for cell in sites if cell in cell_sites)
+    return list(sites.values())
+
+class WeatherPrefetcher:
+    """Background task that keeps weather_store warm for busy ocean areas.
+
+    Refreshes configured regions and the locations most often used by past
+    route requests before their entries expire. Fetches go through
+    batch_fetch_weather_data and therefore share the API rate limiter.
+    """
+
+    def __init__(self, store=weather_store, region_nodes=(), hot_limit=5000,
+                 interval=300, refresh_margin=900, max_per_cycle=2000, on_refresh=None,
+                 resolve_regions=None):
+        self.store = store
+        self.region_nodes = list(region_nodes)
+        self.resolve_regions = resolve_regions  # Blocking; returns region_nodes in the first cycle
+        self.hot = Counter()
+        self.hot_limit = hot_limit
+        self.interval = interval
+        self.refresh_margin = refresh_margin
+        self.max_per_cycle = max_per_cycle
+        self.on_refresh = on_refresh  # Called after each refresh, e.g. to snapshot the store
+
+    def record_request(self, locations):
+        """Count the (lat, lon) locations a route request needed weather for"""
+        self.hot.update(set(locations))
+        if len(self.hot) > 10 * self.hot_limit:
+            self.hot = Counter(dict(self.hot.most_common(self.hot_limit)))
+
+    def due_locations(self):
+        """Hot locations first, then regions, that are missing or expire within refresh_margin"""
+        candidates = [loc for loc, _ in self.hot.most_common(self.hot_limit)]
+        candidates += self.region_nodes
+        max_age = self.store.ttl - self.refresh_margin
+        _, _, due = self.store.get_many(dict.fromkeys(candidates), max_age)
+        return due[:self.max_per_cycle]
+
+    async def refresh_once(self):
+        due = self.due_locations()
+        loop = asyncio.get_running_loop()
+        if due:
+            start = time.time()
+            # Blocking HTTP and rate-limit waits stay off the event loop
+            await loop.run_in_executor(
+                None, lambda: batch_fetch_weather_data(due, max_age=self.store.ttl - self.refresh_margin)
+            )
+            print(f"Prefetched weather for {len(due)} locations in {time.time() - start:.1f}s")
+        # Runs every cycle so weather fetched by route requests is handled too
+        if self.on_refresh:
+            await loop.run_in_executor(None, self.on_refresh)
+        return len(due)
+
+    async def run(self):
+        if self.resolve_regions:
+            # Region cells need the routing graph, so resolve them after the server is up
+            try:
+                self.region_nodes = await asyncio.to_thread(self.resolve_regions)
+                print(f"Prefetching {len(self.region_nodes)} region weather cells")
+            except Exception as e:
+                print(f"Weather prefetch region error: {e}")
+        while True:
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                print(f"Weather prefetch error: {e}")
+            await asyncio.sleep(self.interval)
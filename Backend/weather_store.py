@@ -0,0 +1,112 @@
+import threading
+import time
+import numpy as np
+from cost_calculation import WEATHER_FIELDS, safe_get
+
+WEATHER_TTL = 3600  # Matches the weather_api cache expiry
+
+# Spread (standard deviation) of nearby values that counts as fully variable weather
+WIND_SPREAD_KMH = 15.0
+WAVE_SPREAD_M = 1.5
+
+# Columns kept in snapshots: field -> (source, API variable)
+SNAPSHOT_FIELDS = dict(WEATHER_FIELDS, weather_code=('weather', 'weather_code'))
+
+class WeatherStore:
+    """Latest weather and marine results per (lat, lon) location with their fetch time"""
+
+    def __init__(self, ttl=WEATHER_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def put_many(self, weather_results, marine_results, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            for loc, weather in weather_results.items():
+                self._entries[loc] = (fetched_at, weather, marine_results.get(loc, {}))
+
+    def get_many(self, locations, max_age=None):
+        """Split locations into cached results and the ones that are missing or older than max_age"""
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        weather_results, marine_results, missing = {}, {}, []
+        with self._lock:
+            for loc in locations:
+                entry = self._entries.get(loc)
+                if entry is None or now - entry[0] > max_age:
+                    missing.append(loc)
+                    continue
+                weather_results[loc], marine_results[loc] = entry[1], entry[2]
+        return weather_results, marine_results, missing
+
+    def prune(self, max_age=None):
+        """Drop entries older than max_age (default ttl); returns how many were removed"""
+        cutoff = time.time() - (self.ttl if max_age is None else max_age)
+        with self._lock:
+            expired = [loc for loc, entry in self._entries.items() if entry[0] < cutoff]
+            for loc in expired:
+                del self._entries[loc]
+        return len(expired)
+
+    def to_arrays(self, since=0):
+        """Columnar snapshot of entries fetched at or after since"""
+        with self._lock:
+            items = [(loc, e) for loc, e in self._entries.items() if e[0] >= since]
+        arrays = {
+            'lat': np.array([loc[0] for loc, _ in items], dtype=float),
+            'lon': np.array([loc[1] for loc, _ in items], dtype=float),
+            'fetched_at': np.array([e[0] for _, e in items], dtype=float),
+        }
+        for field, (source, key) in SNAPSHOT_FIELDS.items():
+            pos = 1 if source == 'weather' else 2
+            arrays[field] = np.array(
+                [safe_get(e[pos].get('current', {}), key, np.nan) for _, e in items], dtype=np.float32
+            )
+        return arrays
+
+    def load_arrays(self, arrays):
+        """Fill the store from a snapshot, keeping any newer entries already present"""
+        weather_results, marine_results = {}, {}
+        for i, loc in enumerate(zip(arrays['lat'].tolist(), arrays['lon'].tolist())):
+            current = {'weather': {}, 'marine': {}}
+            for field, (source, key) in SNAPSHOT_FIELDS.items():
+                value = float(arrays[field][i])
+                if not np.isnan(value):
+                    current[source][key] = value
+            weather_results[loc] = {'current': current['weather']}
+            marine_results[loc] = {'current': current['marine']}
+
+        with self._lock:
+            for i, loc in enumerate(weather_results):
+                fetched_at = float(arrays['fetched_at'][i])
+                if loc not in self._entries or self._entries[loc][0] < fetched_at:
+                    self._entries[loc] = (fetched_at, weather_results[loc], marine_results[loc])
+        return len(weather_results)
+
+    def variability(self, points, radius_deg=3.0):
+        """0-1 weather variability score per (lon, lat) point.
+
+        Scores the spread of fresh wind speeds and wave heights stored within
+        radius_deg of each point; points with fewer than two nearby entries
+        score 0.
+        """
+        arrays = self.to_arrays(since=time.time() - self.ttl)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        scores = np.zeros(len(points))
+        if len(arrays['lat']) < 2:
+            return scores
+        for i, (lon, lat) in enumerate(points):
+            dlon = (arrays['lon'] - lon + 180) % 360 - 180
+            near = (np.abs(arrays['lat'] - lat) <= radius_deg) & (np.abs(dlon) <= radius_deg)
+            if near.sum() < 2:
+                continue
+            wind = np.nanstd(arrays['wind_speed'][near]) / WIND_SPREAD_KMH
+            wave = np.nanstd(arrays['wave_height'][near]) / WAVE_SPREAD_M
+            scores[i] = np.nanmax([wind, wave, 0.0])
+        return np.clip(scores, 0, 1)
+
+    def __len__(self):
+        return len(self._entries)
+
+weather_store = WeatherStore()
@@ -3,6 +3,55 @@ import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
 import './App.css';
 
+// Decode a Google encoded polyline into [lat, lon] pairs
+const decodePolyline = (encoded, precision = 5) => {
+  const factor = Math.pow(10, precision);
+  const coords = [];
+  let index = 0, lat = 0, lon = 0;
+
+  const nextValue = () => {
+    let result = 0, shift = 0, byte;
+    do {
+      byte = encoded.charCodeAt(index++) - 63;
+      result |= (byte & 0x1f) << shift;
+      shift += 5;
+    } while (byte >= 0x20);
+    return result & 1 ? ~(result >> 1) : result >> 1;
+  };
+
+  while (index < encoded.length) {
+    lat += nextValue();
+    lon += nextValue();
+    coords.push([lat / factor, lon / factor]);
+  }
+  return coords;
+};
+
+// Turn a binary 'final' frame back into the same shape as the JSON message
+const decodeCompactFinal = (buffer) => {
+  const view = new DataView(buffer);
+  const headerLength = view.getUint32(0, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+  const path = decodePolyline(header.path);
+  const { columns, count } = header.weather;
+
+  const values = {};
+  columns.forEach((name, i) => {
+    values[name] = new Float32Array(buffer, 4 + headerLength + i * count * 4, count);
+  });
+  const weather = path.slice(0, count).map((coordinate, j) => {
+    const point = { coordinate };
+    columns.forEach(name => {
+      // float32 carries ~7 digits, round so popups do not show noise
+      point[name] = Number.isNaN(values[name][j]) ? 'N/A' : Math.round(values[name][j] * 100) / 100;
+    });
+    return point;
+  });
+
+  const routes = header.routes && header.routes.map(route => ({ ...route, path: decodePolyline(route.path) }));
+  return { ...header, path, weather, routes };
+};
+
 function App() {
   const [coordinates, setCoordinates] = useState([]);
   const [weatherData, setWeatherData] = useState([]);
@@ -105,19 +154,24 @@ function App() {
   const connectWebSocket = () => {
     setStatus('Connecting...');
     wsRef.current = new WebSocket('ws://localhost:5000');
+    wsRef.current.binaryType = 'arraybuffer';
 
     wsRef.current.onopen = () => {
       setStatus('Path is Mapping...');
       const message = JSON.stringify({
         type: 'start',
         start: start.split(',').map(Number),
-        end: end.split(',').map(Number)
+        end: end.split(',').map(Number),
+        encoding: 'compact'
       });
       wsRef.current.send(message);
     };
 
     wsRef.current.onmessage = (event) => {
-      const data = JSON.parse(event.data);
+      // Binary frames carry the compact route encoding, text frames are JSON
+      const data = event.data instanceof ArrayBuffer
+        ? decodeCompactFinal(event.data)
+        : JSON.parse(event.data);
       switch (data.type) {
         case 'final':
           setCoordinates(data.path);